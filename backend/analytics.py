@@ -0,0 +1,416 @@
+"""
+Columnar in-memory snapshot of ``shipments`` for ad-hoc analytics.
+
+The snapshot holds one NumPy array per column (id, route, status code,
+customer code, revenue, shipped_at and created_at as int64 epoch seconds).
+Group-by, time-bucket and filter queries run as vectorized operations over
+it instead of scanning the table through the ORM.
+
+The snapshot refreshes at most every ANALYTICS_REFRESH_SECONDS. A refresh
+only reads rows above the ``id`` high-water mark plus any shipment the ORM
+updated or deleted since the last one (tracked by mapper events and marked
+once the session commits). Writes that bypass the ORM are picked up on the
+next ``snapshot.reload()``.
+"""
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from database import in_chunks, read_engine
+from models import Shipment
+
+REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "5"))
+
+# Status codes; statuses outside this list get codes appended at load time
+STATUSES = ["pending", "shipped", "delivered", "delayed"]
+DELETED = -1
+NOT_SHIPPED = np.iinfo(np.int64).min
+
+GROUPS = ("route", "status", "customer")
+BUCKETS = ("day", "week", "month")
+METRICS = ("count", "revenue", "avg_revenue", "delivered", "delayed", "delayed_rate")
+
+LOAD_BATCH = 100_000
+DAY = 86_400
+
+
+class AnalyticsError(ValueError):
+    pass
+
+
+# Read through the raw DBAPI cursor: building Row objects for millions of
+# tuples would cost more than the query itself
+_SELECT = (
+    "SELECT id, route_id, status, customer_name, revenue, "
+    # Epoch seconds; julianday() is much cheaper than strftime('%s')
+    "CAST(ROUND((julianday(shipped_at) - 2440587.5) * 86400) AS INTEGER), "
+    "CAST(ROUND((julianday(created_at) - 2440587.5) * 86400) AS INTEGER) "
+    "FROM shipments"
+)
+_APPEND_SQL = _SELECT + " WHERE id > ? ORDER BY id LIMIT ?"
+
+
+class Snapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Guards only _dirty, so a committing writer never waits for a
+        # refresh or a query holding _lock
+        self._dirty_lock = threading.Lock()
+        self._dirty = set()
+        self._reset()
+
+    def _reset(self):
+        self.id = np.empty(0, np.int64)
+        self.route = np.empty(0, np.int32)
+        self.status = np.empty(0, np.int8)
+        self.customer = np.empty(0, np.int32)
+        self.revenue = np.empty(0, np.float64)
+        self.shipped_at = np.empty(0, np.int64)
+        self.created_at = np.empty(0, np.int64)
+        self.statuses = list(STATUSES)
+        self.customers = []
+        self._customer_codes = {}
+        self.route_names = {}
+        self.high_water_id = 0
+        self.refreshed_at = 0.0
+
+    def mark_dirty(self, shipment_ids):
+        with self._dirty_lock:
+            self._dirty.update(shipment_ids)
+
+    def reload(self):
+        with self._lock:
+            self._reset()
+            with self._dirty_lock:
+                self._dirty.clear()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < REFRESH_SECONDS:
+                return
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, set()
+            with read_engine.connect() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    self.route_names = dict(cursor.execute("SELECT id, name FROM routes").fetchall())
+                    self._append(cursor)
+                    self._patch(cursor, dirty)
+                finally:
+                    cursor.close()
+            self.refreshed_at = time.monotonic()
+
+    def _encode(self, rows):
+        ids, routes, statuses, customers, revenue, shipped_at, created_at = zip(*rows)
+        status_codes = {status: i for i, status in enumerate(self.statuses)}
+        for status in set(statuses) - status_codes.keys():
+            lowered = (status or "").lower()
+            if lowered not in self.statuses:
+                self.statuses.append(lowered)
+            status_codes[status] = self.statuses.index(lowered)
+        for name in set(customers) - self._customer_codes.keys():
+            self._customer_codes[name] = len(self.customers)
+            self.customers.append(name)
+        customer_codes = self._customer_codes
+        return (
+            np.array(ids, np.int64),
+            np.array(routes, np.int32),
+            np.array([status_codes[status] for status in statuses], np.int8),
+            np.array([customer_codes[name] for name in customers], np.int32),
+            np.array([r or 0.0 for r in revenue], np.float64),
+            np.array([NOT_SHIPPED if t is None else t for t in shipped_at], np.int64),
+            np.array([NOT_SHIPPED if t is None else t for t in created_at], np.int64),
+        )
+
+    def _append(self, cursor):
+        while True:
+            rows = cursor.execute(_APPEND_SQL, (self.high_water_id, LOAD_BATCH)).fetchall()
+            if not rows:
+                return
+            columns = self._encode(rows)
+            for name, values in zip(
+                ("id", "route", "status", "customer", "revenue", "shipped_at", "created_at"), columns
+            ):
+                setattr(self, name, np.concatenate([getattr(self, name), values]))
+            self.high_water_id = int(self.id[-1])
+
+    def _patch(self, cursor, dirty):
+        dirty = sorted(i for i in dirty if i <= self.high_water_id)
+        for chunk in in_chunks(dirty):
+            positions = np.searchsorted(self.id, chunk)
+            found = positions < len(self.id)
+            found[found] = self.id[positions[found]] == np.array(chunk)[found]
+            self.status[positions[found]] = DELETED
+            placeholders = ", ".join("?" * len(chunk))
+            rows = cursor.execute(f"{_SELECT} WHERE id IN ({placeholders})", chunk).fetchall()
+            if not rows:
+                continue
+            ids, routes, statuses, customers, revenue, shipped_at, created_at = self._encode(rows)
+            at = np.searchsorted(self.id, ids)
+            self.route[at] = routes
+            self.status[at] = statuses
+            self.customer[at] = customers
+            self.revenue[at] = revenue
+            self.shipped_at[at] = shipped_at
+            self.created_at[at] = created_at
+
+    def stats(self):
+        return {
+            "rows": int(np.count_nonzero(self.status != DELETED)),
+            "highWaterId": self.high_water_id,
+            "ageSeconds": round(time.monotonic() - self.refreshed_at, 3) if self.refreshed_at else None,
+        }
+
+
+snapshot = Snapshot()
+
+
+# Changed ids are collected on the session while it flushes and marked only
+# after it commits: a refresh in between would read the old row and clear them
+
+
+@event.listens_for(Shipment, "after_update")
+@event.listens_for(Shipment, "after_delete")
+def _on_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("analytics_dirty", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_changed(session):
+    dirty = session.info.pop("analytics_dirty", None)
+    if dirty:
+        snapshot.mark_dirty(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session):
+    session.info.pop("analytics_dirty", None)
+
+
+def _epoch_day(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+def _bucket_codes(shipped_days, bucket: str):
+    if bucket == "day":
+        return shipped_days
+    if bucket == "week":
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        return (shipped_days + 3) // 7
+    return shipped_days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _bucket_label(code: int, bucket: str) -> str:
+    if bucket == "day":
+        return (date(1970, 1, 1) + timedelta(days=int(code))).isoformat()
+    if bucket == "week":
+        return (date(1970, 1, 1) + timedelta(days=int(code) * 7 - 3)).isoformat()
+    return str(np.datetime64(int(code), "M"))
+
+
+def _parse(values, allowed, what):
+    values = [v.strip() for v in values.split(",") if v.strip()] if values else []
+    unknown = [v for v in values if v not in allowed]
+    if unknown:
+        raise AnalyticsError(f"Unknown {what} {', '.join(unknown)}; expected one of {', '.join(allowed)}")
+    return values
+
+
+def _derive(parts, metrics):
+    count = parts["count"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derived = {
+            "count": count,
+            "revenue": np.round(parts["revenue"], 2),
+            "avg_revenue": np.round(np.where(count > 0, parts["revenue"] / count, 0.0), 2),
+            "delivered": parts["delivered"],
+            "delayed": parts["delayed"],
+            "delayed_rate": np.round(np.where(count > 0, parts["delayed"] / count, 0.0), 4),
+        }
+    return {metric: derived[metric] for metric in metrics}
+
+
+def query(
+    group_by: str = None,
+    bucket: str = None,
+    metrics: str = "count,revenue",
+    status: str = None,
+    route_id: int = None,
+    customer: str = None,
+    since: date = None,
+    until: date = None,
+    rolling: int = None,
+    sort: str = None,
+    limit: int = 1000,
+):
+    """
+    Aggregates the snapshot. ``group_by`` is a comma list of route, status
+    and customer; ``bucket`` adds a day, week or month dimension on
+    shipped_at; ``since``/``until`` filter shipped_at inclusively.
+    ``rolling=N`` (with bucket=day) turns each day into the sum over the N
+    days ending on it. ``sort`` names a metric, ``-`` prefix for descending.
+    """
+    started = time.perf_counter()
+    groups = _parse(group_by, GROUPS, "group")
+    metrics = _parse(metrics, METRICS, "metric") or ["count"]
+    if bucket is not None and bucket not in BUCKETS:
+        raise AnalyticsError(f"Unknown bucket {bucket}; expected one of {', '.join(BUCKETS)}")
+    if rolling is not None and (bucket != "day" or rolling < 1):
+        raise AnalyticsError("rolling needs bucket=day and a window of at least 1 day")
+    if sort is not None and sort.lstrip("-") not in metrics:
+        raise AnalyticsError("sort must name one of the requested metrics")
+
+    snapshot.refresh()
+    # Held while aggregating so a concurrent refresh cannot swap arrays mid-query
+    with snapshot._lock:
+        rows, matched, groups = _aggregate(
+            snapshot, groups, bucket, metrics, status, route_id, customer, since, until, rolling, sort, limit
+        )
+    return {
+        "rows": rows,
+        "matched": matched,
+        "groups": groups,
+        "snapshot": snapshot.stats(),
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def _aggregate(s, groups, bucket, metrics, status, route_id, customer, since, until, rolling, sort, limit):
+    mask = s.status != DELETED
+    if status is not None:
+        code = s.statuses.index(status.lower()) if status.lower() in s.statuses else -2
+        mask &= s.status == code
+    if route_id is not None:
+        mask &= s.route == route_id
+    if customer is not None:
+        mask &= s.customer == s._customer_codes.get(customer, -1)
+    if since is not None or until is not None or bucket is not None:
+        mask &= s.shipped_at != NOT_SHIPPED
+    if since is not None:
+        # Days before ``since`` still feed its first rolling windows
+        lead = rolling - 1 if rolling else 0
+        mask &= s.shipped_at >= (_epoch_day(since) - lead) * DAY
+    if until is not None:
+        mask &= s.shipped_at < (_epoch_day(until) + 1) * DAY
+
+    idx = np.flatnonzero(mask)
+    dimensions = []  # (name, codes)
+    for group in groups:
+        codes = {"route": s.route, "status": s.status, "customer": s.customer}[group][idx].astype(np.int64)
+        dimensions.append((group, codes))
+    if bucket is not None:
+        dimensions.append((bucket, _bucket_codes(s.shipped_at[idx] // DAY, bucket)))
+
+    if dimensions:
+        # Compose one int64 key per row: mixed-radix over each dimension's range
+        key = np.zeros(len(idx), np.int64)
+        bases = []
+        size = 1
+        for _, codes in dimensions:
+            low = int(codes.min()) if len(codes) else 0
+            span = (int(codes.max()) - low + 1) if len(codes) else 1
+            key = key * span + (codes - low)
+            bases.append((low, span))
+            size *= span
+        if size <= max(4 * len(key), 1 << 20):
+            # Small key space: a dense lookup table beats sorting for np.unique
+            keys = np.flatnonzero(np.bincount(key, minlength=size))
+            lookup = np.empty(size, np.int64)
+            lookup[keys] = np.arange(len(keys))
+            inverse = lookup[key]
+        else:
+            keys, inverse = np.unique(key, return_inverse=True)
+    else:
+        keys, inverse = np.zeros(1, np.int64), np.zeros(len(idx), np.int64)
+        bases = []
+
+    n = len(keys)
+    status_codes = s.status[idx]
+    parts = {
+        "count": np.bincount(inverse, minlength=n),
+        "revenue": np.bincount(inverse, weights=s.revenue[idx], minlength=n),
+        "delivered": np.bincount(inverse, weights=status_codes == STATUSES.index("delivered"), minlength=n).astype(np.int64),
+        "delayed": np.bincount(inverse, weights=status_codes == STATUSES.index("delayed"), minlength=n).astype(np.int64),
+    }
+
+    # Decode the composed keys back into one code array per dimension
+    decoded = []
+    remainder = keys
+    for low, span in reversed(bases):
+        decoded.append(remainder % span + low)
+        remainder = remainder // span
+    decoded.reverse()
+
+    if rolling is not None and len(keys):
+        decoded, parts = _rolling(decoded, parts, rolling, since, until)
+
+    values = _derive(parts, metrics)
+    order = np.arange(len(values[metrics[0]]))
+    if sort is not None:
+        column = values[sort.lstrip("-")]
+        order = np.argsort(-column if sort.startswith("-") else column, kind="stable")
+    order = order[:limit]
+
+    labels = [name for name, _ in dimensions]
+    rows = []
+    for i in order:
+        row = {}
+        for name, codes in zip(labels, decoded):
+            code = int(codes[i])
+            if name == "route":
+                row["route_id"] = code
+                row["route"] = s.route_names.get(code, "Unknown")
+            elif name == "status":
+                row["status"] = s.statuses[code]
+            elif name == "customer":
+                row["customer"] = s.customers[code]
+            else:
+                row[name] = _bucket_label(code, name)
+        for metric, column in values.items():
+            row[metric] = column[i].item()
+        rows.append(row)
+    return rows, int(len(idx)), int(len(values[metrics[0]]))
+
+
+def _rolling(decoded, parts, window: int, since: date, until: date):
+    """Densifies the trailing day dimension per group and sums a trailing window."""
+    *group_codes, days = decoded
+    first = _epoch_day(since) if since else int(days.min())
+    last = _epoch_day(until) if until else int(days.max())
+    # Earlier days feed the first windows but are not reported
+    start = first - window + 1
+    span = last - start + 1
+
+    if group_codes:
+        stacked = np.stack(group_codes, axis=1)
+        unique_groups, group_index = np.unique(stacked, axis=0, return_inverse=True)
+        group_index = group_index.reshape(-1)
+    else:
+        unique_groups, group_index = np.zeros((1, 0), np.int64), np.zeros(len(days), np.int64)
+
+    in_range = (days >= start) & (days <= last)
+    cells = group_index[in_range] * span + (days[in_range] - start)
+    rolled = {}
+    for name, totals in parts.items():
+        grid = np.bincount(cells, weights=totals[in_range], minlength=len(unique_groups) * span)
+        grid = grid.reshape(len(unique_groups), span)
+        cumulative = np.cumsum(grid, axis=1)
+        shifted = np.zeros_like(cumulative)
+        shifted[:, window:] = cumulative[:, :-window]
+        window_sum = (cumulative - shifted)[:, window - 1 :]
+        rolled[name] = window_sum.reshape(-1)
+        if name != "revenue":
+            rolled[name] = np.rint(rolled[name]).astype(np.int64)
+
+    reported = last - first + 1
+    new_days = np.tile(np.arange(first, last + 1), len(unique_groups))
+    new_groups = [np.repeat(unique_groups[:, i], reported) for i in range(unique_groups.shape[1])]
+    return new_groups + [new_days], rolled
@@ -0,0 +1,353 @@
+"""
+Build step for the bundled frontend (the HTML, CSS, JS and images next to
+backend/).
+
+``build`` writes into ASSETS_DIR:
+
+- every CSS, JS and image file under a content-hashed name
+  (``nav.3f2a9c1e0b.css``), so it can be cached forever;
+- resized JPEG and WebP variants of every large JPEG/PNG, at the
+  IMAGE_WIDTHS narrower than the original. CSS ``background-image``s are
+  rewritten to an ``image-set()`` that lets the browser take the WebP, with a
+  smaller variant for narrow screens;
+- the HTML pages under their own names, with every local reference pointing
+  at the hashed files;
+- ``.gz`` and ``.br`` siblings of every text file, compressed once at the
+  highest levels rather than on every request.
+
+``manifest.json`` maps each URL path to its files. The build runs on app
+startup when the sources changed since the last one, or by hand:
+
+    python assets.py
+
+``serve`` answers a request for a URL path from the manifest, picking the
+br, gzip or identity file by Accept-Encoding. Hashed files are served with
+``immutable`` caching, HTML with ``no-cache`` and an ETag, so a deploy shows
+up on the next page load.
+
+Pillow (variants) and brotli (.br files) are optional; without them the
+build skips that output.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import threading
+
+from fastapi import HTTPException, Request
+
+import files
+
+try:
+    from PIL import Image
+except ImportError:  # no image variants
+    Image = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+FRONTEND_DIR = os.path.abspath(os.getenv("FRONTEND_DIR", os.path.join(os.path.dirname(__file__), "..")))
+ASSETS_DIR = os.path.abspath(os.getenv("ASSETS_DIR", "static-build"))
+STATIC_PREFIX = "/static/"
+
+PAGES = (".html",)
+HASHED = (".css", ".js", ".jpg", ".jpeg", ".png", ".webp", ".svg", ".ico")
+COMPRESSIBLE = (".html", ".css", ".js", ".svg", ".json")
+RASTER = (".jpg", ".jpeg", ".png")
+
+IMAGE_WIDTHS = (640, 1280, 1920)
+# Images narrower than this are only hashed
+MIN_VARIANT_WIDTH = 800
+JPEG_QUALITY = 80
+WEBP_QUALITY = 78
+# Variant used for CSS backgrounds, and the one for screens up to SMALL_SCREEN px
+BACKGROUND_WIDTH = 1920
+SMALL_BACKGROUND_WIDTH = 1280
+SMALL_SCREEN = 960
+
+# Compressed files that save less than this are not kept
+MIN_SAVING = 0.05
+
+HASH_LENGTH = 10
+MANIFEST = "manifest.json"
+
+# Encodings we precompress, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+logger = logging.getLogger("logistics.assets")
+
+# Missing from the stdlib table before Python 3.13
+mimetypes.add_type("image/webp", ".webp")
+
+_REFERENCE = re.compile(r"""(?P<attr>\b(?:href|src)=)(?P<quote>["'])(?P<name>[^"'#?:]+)(?P=quote)""")
+_CSS_URL = re.compile(r"""url\((?P<quote>["']?)(?P<name>[^"')?#:]+)(?P=quote)\)""")
+_CSS_BACKGROUND = re.compile(
+    r"""(?P<selector>[^{}]+)\{(?P<before>[^{}]*?)background-image:\s*url\((?P<quote>["']?)(?P<name>[^"')?#:]+)(?P=quote)\);"""
+)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+_manifest = None
+_lock = threading.Lock()
+
+
+def _hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+
+def _hashed_name(name: str, content: bytes, suffix: str = "") -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}{suffix}.{_hash(content)}{ext}"
+
+
+def _sources(src: str):
+    names = []
+    for name in sorted(os.listdir(src)):
+        path = os.path.join(src, name)
+        if os.path.isfile(path) and os.path.splitext(name)[1].lower() in PAGES + HASHED:
+            names.append(name)
+    return names
+
+
+def fingerprint(src: str = FRONTEND_DIR) -> str:
+    """Changes whenever a source file is added, removed or modified."""
+    digest = hashlib.sha256()
+    for name in _sources(src):
+        stat = os.stat(os.path.join(src, name))
+        digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _encode_image(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+    elif fmt == "PNG":
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _variants(name: str, content: bytes):
+    """{(width, ext): bytes} of the resized and WebP versions of an image."""
+    if Image is None:
+        return {}
+    image = Image.open(io.BytesIO(content))
+    if image.width < MIN_VARIANT_WIDTH:
+        return {}
+    ext = os.path.splitext(name)[1].lower()
+    original = "PNG" if ext == ".png" else "JPEG"
+    variants = {}
+    for width in [w for w in IMAGE_WIDTHS if w < image.width] + [image.width]:
+        resized = image if width == image.width else image.resize(
+            (width, round(image.height * width / image.width)), Image.LANCZOS
+        )
+        if width != image.width:
+            variants[(width, ext)] = _encode_image(resized, original)
+        variants[(width, ".webp")] = _encode_image(resized, "WEBP")
+    return variants
+
+
+def _compress(path: str, content: bytes):
+    """Writes the .br/.gz siblings worth keeping; returns their encodings."""
+    encodings = []
+    for encoding, suffix in ENCODINGS:
+        if encoding == "br":
+            if brotli is None:
+                continue
+            compressed = brotli.compress(content, quality=11)
+        else:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) <= len(content) * (1 - MIN_SAVING):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            encodings.append(encoding)
+    return encodings
+
+
+def _pick(variants, width: int, ext: str):
+    """The narrowest ``ext`` variant at least ``width`` wide, else the widest one."""
+    widths = sorted(w for w, e in variants if e == ext)
+    if not widths:
+        return None
+    return variants[(next((w for w in widths if w >= width), widths[-1]), ext)]
+
+
+def _image_set(variants, width: int, ext: str) -> str:
+    return (
+        f"image-set(url('{_pick(variants, width, '.webp')}') type('image/webp'), "
+        f"url('{_pick(variants, width, ext)}') type('{mimetypes.types_map.get(ext, 'image/jpeg')}'))"
+    )
+
+
+def _rewrite_css(css: str, urls, images) -> str:
+    small_screen = []
+
+    def background(match):
+        variants = images.get(match["name"])
+        if not variants:
+            return match.group(0)
+        ext = os.path.splitext(match["name"])[1].lower()
+        selector = _CSS_COMMENT.sub("", match["selector"]).strip()
+        # Browsers without image-set() keep the first declaration
+        small_screen.append(
+            f"\n@media (max-width: {SMALL_SCREEN}px) {{\n  {selector} {{ "
+            f"background-image: {_image_set(variants, SMALL_BACKGROUND_WIDTH, ext)}; }}\n}}\n"
+        )
+        return (
+            f"{match['selector']}{{{match['before']}"
+            f"background-image: url('{_pick(variants, BACKGROUND_WIDTH, ext)}');\n"
+            f"  background-image: {_image_set(variants, BACKGROUND_WIDTH, ext)};"
+        )
+
+    css = _CSS_BACKGROUND.sub(background, css)
+    css = _CSS_URL.sub(lambda m: f"url('{urls[m['name']]}')" if m["name"] in urls else m.group(0), css)
+    return css + "".join(small_screen)
+
+
+def _rewrite_html(html: str, urls) -> str:
+    return _REFERENCE.sub(
+        lambda m: f"{m['attr']}{m['quote']}{urls[m['name']]}{m['quote']}" if m["name"] in urls else m.group(0),
+        html,
+    )
+
+
+def build(src: str = FRONTEND_DIR, out: str = ASSETS_DIR):
+    """Builds the assets of ``src`` into ``out`` and returns the manifest."""
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    names = _sources(src)
+    urls = {}  # source name -> URL
+    images = {}  # source name -> {(width, ext): URL}
+    served = {}  # URL path -> file entry
+    pending_text = {}  # hashed-later sources: CSS (rewritten), then HTML
+
+    def emit(url_path: str, file_name: str, content: bytes, immutable: bool):
+        path = os.path.join(tmp, file_name)
+        with open(path, "wb") as f:
+            f.write(content)
+        ext = os.path.splitext(file_name)[1].lower()
+        served[url_path] = {
+            "file": file_name,
+            "media_type": mimetypes.types_map.get(ext, "application/octet-stream"),
+            "etag": f'"{_hash(content)}"',
+            "immutable": immutable,
+            "encodings": _compress(path, content) if ext in COMPRESSIBLE else [],
+        }
+
+    for name in names:
+        with open(os.path.join(src, name), "rb") as f:
+            content = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        if ext in PAGES or ext == ".css":
+            pending_text[name] = content
+            continue
+        hashed = _hashed_name(name, content)
+        emit(STATIC_PREFIX + hashed, hashed, content, True)
+        urls[name] = STATIC_PREFIX + hashed
+        if ext in RASTER:
+            images[name] = {}
+            if Image is not None:
+                images[name][(Image.open(io.BytesIO(content)).width, ext)] = urls[name]
+            for (width, variant_ext), variant in _variants(name, content).items():
+                stem = os.path.splitext(name)[0]
+                variant_name = _hashed_name(f"{stem}{variant_ext}", variant, f".{width}")
+                emit(STATIC_PREFIX + variant_name, variant_name, variant, True)
+                images[name][(width, variant_ext)] = STATIC_PREFIX + variant_name
+
+    for name, content in pending_text.items():
+        if name.lower().endswith(".css"):
+            css = _rewrite_css(content.decode(), urls, images).encode()
+            hashed = _hashed_name(name, css)
+            emit(STATIC_PREFIX + hashed, hashed, css, True)
+            urls[name] = STATIC_PREFIX + hashed
+
+    for name, content in pending_text.items():
+        if name.lower().endswith(PAGES):
+            html = _rewrite_html(content.decode(), urls).encode()
+            emit("/" + name, name, html, False)
+            if name == "index.html":
+                served["/"] = served["/index.html"]
+
+    manifest = {
+        "fingerprint": fingerprint(src),
+        "files": served,
+        "assets": urls,
+        "images": {name: {f"{w}{e}": url for (w, e), url in v.items()} for name, v in images.items()},
+    }
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    return manifest
+
+
+def load(src: str = FRONTEND_DIR, out: str = ASSETS_DIR):
+    """Loads the manifest, rebuilding first if the sources changed."""
+    global _manifest
+    with _lock:
+        manifest = None
+        try:
+            with open(os.path.join(out, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if manifest is None or manifest.get("fingerprint") != fingerprint(src):
+            logger.info("Building frontend assets from %s", src)
+            manifest = build(src, out)
+        _manifest = manifest
+        return manifest
+
+
+def _accepted(header: str):
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request: Request, url_path: str):
+    manifest = _manifest if _manifest is not None else load()
+    entry = manifest["files"].get(url_path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    path = os.path.join(ASSETS_DIR, entry["file"])
+    etag = entry["etag"]
+    headers = {"Vary": "Accept-Encoding"}
+    accepted = _accepted(request.headers.get("accept-encoding"))
+    for encoding, suffix in ENCODINGS:
+        if encoding in entry["encodings"] and (encoding in accepted or "*" in accepted):
+            path += suffix
+            # Each encoding is its own representation, with its own validator
+            etag = f'{etag[:-1]}-{encoding}"'
+            headers["Content-Encoding"] = encoding
+            break
+    cache_control = files.IMMUTABLE if entry["immutable"] else "no-cache"
+    return files.file_response(request, path, entry["media_type"], etag, cache_control=cache_control, headers=headers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the hashed, compressed frontend assets.")
+    parser.add_argument("--src", default=FRONTEND_DIR)
+    parser.add_argument("--out", default=ASSETS_DIR)
+    args = parser.parse_args()
+    manifest = build(args.src, args.out)
+    total = sum(os.path.getsize(os.path.join(args.out, e["file"])) for e in manifest["files"].values())
+    print(f"Built {len(manifest['files'])} files ({total / 1024:.0f} KiB) into {args.out}")
@@ -0,0 +1,76 @@
+"""
+Times /api/analytics-style queries on the columnar snapshot against the same
+aggregate as a SQL GROUP BY.
+
+    python -m benchmarks.analytics --scale 1e6
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-analytics-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/analytics.db")
+
+from sqlalchemy import text  # noqa: E402
+
+from database import engine  # noqa: E402
+import analytics  # noqa: E402
+import seeder  # noqa: E402
+
+# name -> (analytics.query kwargs, equivalent SQL)
+QUERIES = {
+    "revenue by route by week": (
+        {"group_by": "route", "bucket": "week", "metrics": "revenue"},
+        "SELECT route_id, strftime('%Y-%W', shipped_at), sum(revenue) FROM shipments "
+        "WHERE shipped_at IS NOT NULL GROUP BY 1, 2",
+    ),
+    "delayed rate per customer": (
+        {"group_by": "customer", "metrics": "count,delayed_rate", "sort": "-delayed_rate"},
+        "SELECT customer_name, count(*), avg(status = 'delayed') FROM shipments GROUP BY 1 ORDER BY 3 DESC",
+    ),
+    "rolling 30-day delivered": (
+        {
+            "bucket": "day",
+            "rolling": 30,
+            "metrics": "delivered",
+            "since": date.today() - timedelta(days=90),
+        },
+        "SELECT d.day, (SELECT count(*) FROM shipments WHERE status = 'delivered' "
+        "AND date(shipped_at) BETWEEN date(d.day, '-29 days') AND d.day) FROM "
+        "(SELECT DISTINCT date(shipped_at) AS day FROM shipments "
+        "WHERE shipped_at >= date('now', '-90 days')) AS d",
+    ),
+}
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Columnar analytics vs SQL GROUP BY")
+    parser.add_argument("--scale", type=float, default=1e6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    seeder.generate(int(args.scale), verbose=False)
+    load = timed(analytics.snapshot.reload, 1)
+    print(f"snapshot load: {load:.2f}s for {analytics.snapshot.stats()['rows']} shipments")
+    print(f"{'query':<28} {'numpy ms':>9} {'sql ms':>9}")
+    with engine.connect() as conn:
+        for name, (kwargs, sql) in QUERIES.items():
+            columnar = timed(lambda: analytics.query(**kwargs), args.repeat)
+            # The correlated rolling query is far slower; run it once
+            baseline = timed(lambda: conn.execute(text(sql)).fetchall(), 1)
+            print(f"{name:<28} {columnar * 1000:>9.1f} {baseline * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,64 @@
+"""
+Measures bulk order ingestion throughput (parse, validate and insert).
+
+    python -m benchmarks.bulk_orders --orders 100000 --batch 5000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Product  # noqa: E402
+import ingest  # noqa: E402
+
+
+def payload(start: int, count: int, ndjson: bool) -> bytes:
+    orders = [
+        {
+            "order_name": f"Order {i}",
+            "customer_name": f"Customer {i % 997}",
+            "destination": ("Lagos", "Abuja", "Kano", "Enugu")[i % 4],
+            "product_id": i % 50 + 1,
+        }
+        for i in range(start, start + count)
+    ]
+    if ndjson:
+        return "\n".join(json.dumps(o) for o in orders).encode()
+    return json.dumps(orders).encode()
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk order ingestion throughput")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=5_000)
+    parser.add_argument("--ndjson", action="store_true")
+    args = parser.parse_args(argv)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Enough stock that every order is accepted
+        conn.execute(Product.__table__.insert(), [{"name": f"Product {i}", "quantity": args.orders} for i in range(50)])
+    content_type = "application/x-ndjson" if args.ndjson else "application/json"
+    bodies = [payload(i, min(args.batch, args.orders - i), args.ndjson) for i in range(0, args.orders, args.batch)]
+
+    inserted = 0
+    start = time.perf_counter()
+    for body in bodies:
+        db = SessionLocal()
+        try:
+            rows, errors = ingest.parse_orders(body, content_type)
+            inserted += len(ingest.insert_orders(db, rows)[0])
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - start
+    print(f"{inserted} orders in {elapsed:.2f}s -> {inserted / elapsed:,.0f} orders/s (batch={args.batch})")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,183 @@
+"""
+Mixed read/write latency for DB_MODE=sync versus DB_MODE=async.
+
+Concurrent clients issue webhook orders and status updates (writes) mixed
+with dashboard and order-list requests (reads) against the app in-process.
+Without --mode both modes run in turn, each in a fresh interpreter; with it
+only that mode runs, on a scratch database unless DATABASE_URL is set.
+
+    python -m benchmarks.concurrency --clients 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = ("sync", "async")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def size_write_pool():
+    """
+    For write-only loads in DB_MODE=sync: the 40 worker threads can all end
+    up waiting for one of the few write connections while the requests
+    holding them wait for a thread to close their session. A write pool as
+    large as the thread pool avoids that. Call before importing ``database``.
+    """
+    if os.getenv("DB_MODE", "sync") == "sync":
+        os.environ.setdefault("DB_MAX_OVERFLOW", "36")
+
+
+def seed(rows: int):
+    from database import SessionLocal, engine
+    from models import Base, Order, Product, Route, Shipment
+    import rollups
+
+    rng = random.Random(7)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Route.__table__.insert(), [{"name": f"Route {i}"} for i in range(20)])
+        # The webhook orders product 1; stock it so no order is refused
+        conn.execute(Product.__table__.insert(), [{"name": "Bench", "quantity": 10**9}])
+        conn.execute(
+            Shipment.__table__.insert(),
+            [
+                {
+                    "tracking_id": f"TRK{i:09d}",
+                    "customer_name": f"Customer {i % 1000}",
+                    "route_id": rng.randint(1, 20),
+                    "status": rng.choice(["pending", "shipped", "delivered", "delayed"]),
+                    "revenue": 100.0,
+                    "shipped_at": now - timedelta(days=rng.randint(0, 365)),
+                }
+                for i in range(rows)
+            ],
+        )
+        conn.execute(
+            Order.__table__.insert(),
+            [
+                {"order_name": f"Order {i}", "product_id": 1, "customer_name": "C", "destination": "D", "status": "pending"}
+                for i in range(rows // 10)
+            ],
+        )
+    db = SessionLocal()
+    try:
+        rollups.rebuild(db)
+    finally:
+        db.close()
+
+
+async def client(app, call, deadline, write_ratio, orders, rng, latencies):
+    order = json.dumps(
+        {"order_name": "Bench", "customer_name": "Bench", "destination": "Lagos", "product_id": 1}
+    ).encode()
+    while time.perf_counter() < deadline:
+        if rng.random() < write_ratio:
+            if rng.random() < 0.5:
+                kind, args = "write", ("POST", "/api/orders/webhook/", "", order, [("content-type", "application/json")])
+            else:
+                query = f"order_id={rng.randint(1, orders)}&status=shipped"
+                kind, args = "write", ("POST", "/api/update_status/", query)
+        elif rng.random() < 0.5:
+            kind, args = "read", ("GET", "/api/dashboard")
+        else:
+            kind, args = "read", ("GET", "/api/orders/", f"skip={rng.randint(0, orders - 100)}&limit=100")
+        start = time.perf_counter()
+        status, _, _ = await call(app, *args)
+        latencies[kind].append(time.perf_counter() - start)
+        if status >= 400:
+            latencies["errors"].append(status)
+
+
+async def drive(args):
+    import main
+    from benchmarks.asgi import call
+
+    latencies = {"read": [], "write": [], "errors": []}
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        *(
+            client(main.app, call, deadline, args.write_ratio, args.rows // 10, random.Random(i), latencies)
+            for i in range(args.clients)
+        )
+    )
+    await main.dispose_async_engines()
+    return latencies
+
+
+def run_mode(args):
+    # ``database`` reads both when first imported, so they are set before
+    # anything imports it. Run on its own, the mode seeds a scratch database.
+    os.environ["DB_MODE"] = args.mode
+    if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='logistics-bench-')}/bench.db"
+        seed(args.rows)
+    latencies = asyncio.run(drive(args))
+    result = {"mode": args.mode, "errors": len(latencies["errors"])}
+    for kind in ("read", "write"):
+        values = latencies[kind]
+        result[kind] = {
+            "requests": len(values),
+            "rps": len(values) / args.duration,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    print(json.dumps(result))
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Mixed read/write latency, sync vs async")
+    parser.add_argument("--mode", choices=MODES)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    database_url = os.environ.get(
+        "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='logistics-bench-')}/bench.db"
+    )
+    forwarded = [a for a in (argv if argv is not None else sys.argv[1:])]
+    print(f"{'mode':>6} {'kind':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode in MODES:
+        env = {**os.environ, "DATABASE_URL": database_url, "DB_MODE": mode}
+        subprocess.run(
+            [sys.executable, "-c", f"from benchmarks.concurrency import seed; seed({args.rows})"],
+            env=env,
+            check=True,
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.concurrency", "--mode", mode, *forwarded],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        for kind in ("read", "write"):
+            r = result[kind]
+            print(f"{mode:>6} {kind:>6} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+        if result["errors"]:
+            print(f"{mode:>6} {result['errors']} failed requests")
+
+
+if __name__ == "__main__":
+    run()
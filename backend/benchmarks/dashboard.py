@@ -0,0 +1,172 @@
+"""
+Compares the old in-Python /api/dashboard aggregation with the rollup-backed version.
+
+Run from the backend directory:
+
+    python -m benchmarks.dashboard --sizes 10000 100000 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before it creates its engine
+_tmpdir = tempfile.mkdtemp(prefix="logistics-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Route, Shipment  # noqa: E402
+import main  # noqa: E402
+import rollups  # noqa: E402
+
+ROUTES = [
+    "Lagos → Abuja",
+    "Lagos → Port Harcourt",
+    "Abuja → Kano",
+    "Onitsha → Enugu",
+    "Ibadan → Ilorin",
+    "Owerri → Uyo",
+]
+STATUSES = ["pending", "shipped", "delivered", "delayed"]
+
+
+def seed(total: int, rng: random.Random):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Route.__table__.insert(), [{"name": n} for n in ROUTES])
+        batch = []
+        for i in range(total):
+            status = rng.choices(STATUSES, weights=[0.25, 0.25, 0.4, 0.1])[0]
+            shipped_at = None
+            if status != "pending":
+                shipped_at = now - timedelta(days=rng.randint(0, 365))
+            batch.append(
+                {
+                    "tracking_id": f"TRK{i:09d}",
+                    "customer_name": f"Customer {i % 5000}",
+                    "route_id": rng.randint(1, len(ROUTES)),
+                    "status": status,
+                    "revenue": round(rng.uniform(50, 500), 2),
+                    "shipped_at": shipped_at,
+                    "created_at": now,
+                }
+            )
+            if len(batch) == 50_000:
+                conn.execute(Shipment.__table__.insert(), batch)
+                batch.clear()
+        if batch:
+            conn.execute(Shipment.__table__.insert(), batch)
+    db = SessionLocal()
+    try:
+        rollups.rebuild(db)
+    finally:
+        db.close()
+
+
+def legacy_dashboard(db, months_count: int = 6):
+    """The pre-aggregation implementation, kept verbatim for comparison."""
+    shipments = db.query(Shipment).order_by(Shipment.shipped_at).all()
+    total_orders = len(shipments)
+    deliveries = sum(1 for s in shipments if s.status.lower() == "delivered")
+    pending = sum(1 for s in shipments if s.status.lower() == "pending")
+    revenue = sum((s.revenue or 0.0) for s in shipments)
+
+    now = datetime.utcnow()
+    months = []
+    for i in range(months_count - 1, -1, -1):
+        year, month = now.year, now.month - i
+        while month <= 0:
+            month += 12
+            year -= 1
+        months.append(now.replace(year=year, month=month, day=1).strftime("%b %Y"))
+
+    month_counts = defaultdict(int)
+    for s in shipments:
+        if s.shipped_at:
+            month_counts[s.shipped_at.strftime("%b %Y")] += 1
+    shipments_per_month = [month_counts.get(m, 0) for m in months]
+
+    delivered_count = sum(1 for s in shipments if s.status.lower() == "delivered")
+    delayed_count = sum(1 for s in shipments if s.status.lower() == "delayed")
+
+    route_counter = Counter()
+    for s in shipments:
+        route_counter[s.route.name if s.route else "Unknown"] += 1
+
+    return {
+        "kpis": {
+            "totalOrders": total_orders,
+            "deliveries": deliveries,
+            "pending": pending,
+            "revenue": round(revenue, 2),
+        },
+        "charts": {
+            "months": months,
+            "shipmentsPerMonth": shipments_per_month,
+            "statusCounts": [delivered_count, delayed_count],
+        },
+        "topRoutes": route_counter.most_common(6),
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            gc.collect()
+            start = time.perf_counter()
+            result = fn(db)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            db.close()
+    return best, result
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=1_000_000,
+        help="skip the old path above this many shipments",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'shipments':>10} {'path':>7} {'best s':>9} {'max rss MB':>11}")
+    for size in args.sizes:
+        seed(size, random.Random(args.seed))
+
+        new_s, new = timed(main.build_dashboard, args.repeat)
+        print(f"{size:>10} {'sql':>7} {new_s:>9.4f} {max_rss_mb():>11.1f}")
+
+        if size > args.legacy_max:
+            continue
+        old_s, old = timed(legacy_dashboard, args.repeat)
+        print(f"{size:>10} {'legacy':>7} {old_s:>9.4f} {max_rss_mb():>11.1f}")
+
+        assert new["kpis"] == old["kpis"], (new["kpis"], old["kpis"])
+        assert new["charts"] == old["charts"], (new["charts"], old["charts"])
+        print(f"{'':>10} speedup {old_s / new_s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+"""
+Times the dispatch planner on synthetic data (default 50k pending orders
+across 2k fleets) and, separately, committing the plan. Then checks that a
+driver already out with one vehicle is not given orders on another.
+
+    python -m benchmarks.dispatch --orders 50000 --fleets 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Driver, Fleet, Order  # noqa: E402
+import dispatch  # noqa: E402
+
+
+def seed(orders: int, fleets: int, destinations: int, rng: random.Random):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # Zipf-like skew: a few destinations get most of the orders
+    weights = [1 / (rank + 1) for rank in range(destinations)]
+    with engine.begin() as conn:
+        conn.execute(Driver.__table__.insert(), [{"name": f"Driver {i}"} for i in range(fleets)])
+        conn.execute(
+            Fleet.__table__.insert(),
+            [
+                {
+                    "name": f"Fleet {i}",
+                    "driver_id": i,
+                    "status": rng.choices(["active", "maintenance", "inactive"], [0.8, 0.1, 0.1])[0],
+                    "vehicle_type": rng.choice(list(dispatch.VEHICLE_CAPACITY)),
+                    "last_maintenance": "2025-08-01",
+                }
+                for i in range(1, fleets + 1)
+            ],
+        )
+        conn.execute(
+            Order.__table__.insert(),
+            [
+                {
+                    "order_name": f"Order {i}",
+                    "product_id": 1,
+                    "customer_name": f"Customer {i % 5000}",
+                    "destination": f"City {d}",
+                    "status": "pending",
+                }
+                for i, d in enumerate(rng.choices(range(destinations), weights, k=orders))
+            ],
+        )
+
+
+def check_busy_driver():
+    """A driver out in a Truck with 35 orders also has an empty Car."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    order = {"order_name": "Order", "product_id": 1, "customer_name": "Customer", "destination": "City 0"}
+    with engine.begin() as conn:
+        conn.execute(Driver.__table__.insert(), [{"id": 1, "name": "Driver 1"}])
+        conn.execute(
+            Fleet.__table__.insert(),
+            [
+                {"id": 1, "name": "Fleet 1", "driver_id": 1, "status": "active", "vehicle_type": "Truck"},
+                {"id": 2, "name": "Fleet 2", "driver_id": 1, "status": "active", "vehicle_type": "Car"},
+            ],
+        )
+        conn.execute(
+            Order.__table__.insert(),
+            [{**order, "status": "shipped", "fleet_id": 1} for _ in range(35)]
+            + [{**order, "status": "pending", "fleet_id": None} for _ in range(3)],
+        )
+    db = SessionLocal()
+    try:
+        plan = dispatch.plan_dispatch(db)
+    finally:
+        db.close()
+    return plan.loads == {1: (3, 2)}, plan.loads
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Dispatch planner at scale")
+    parser.add_argument("--orders", type=int, default=50_000)
+    parser.add_argument("--fleets", type=int, default=2_000)
+    parser.add_argument("--destinations", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    seed(args.orders, args.fleets, args.destinations, random.Random(args.seed))
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        plan = dispatch.plan_dispatch(db)
+        planned = time.perf_counter() - start
+
+        start = time.perf_counter()
+        assigned = dispatch.commit_plan(db, plan)
+        committed = time.perf_counter() - start
+    finally:
+        db.close()
+
+    fill = [orders / (orders + remaining) for orders, remaining in plan.loads.values()]
+    print(f"plan:   {planned:.3f}s for {args.orders} orders / {args.fleets} fleets")
+    print(f"commit: {committed:.3f}s, {assigned} assigned, {len(plan.unassigned)} unassigned")
+    if fill:
+        print(f"fleets used: {len(fill)}, fill min/max: {min(fill):.2f}/{max(fill):.2f}")
+
+    ok, loads = check_busy_driver()
+    print(f"busy driver: {'ok' if ok else f'FAILED, planned {loads}'}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
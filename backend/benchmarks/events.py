@@ -0,0 +1,86 @@
+"""
+Fan-out cost of the live event broker (live.py).
+
+``--subscribers`` streams read from one broker on the event loop while a
+publisher thread publishes ``--events`` order updates at ``--rate`` per
+second, as request threads do. One subscriber in every ``--slow`` stalls
+``--stall`` seconds on each chunk it gets, like a client on a bad
+connection; it should be resynced rather than slow anyone down. Prints the
+publisher's cost per event and the delay from publish to delivery for the
+other subscribers.
+
+    python -m benchmarks.events --subscribers 1000 --events 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.concurrency import percentile
+
+
+async def subscriber(broker, published, delays, slow: float):
+    async for chunk in broker.stream():
+        received = time.perf_counter()
+        for line in chunk.split(b"\n"):
+            if line.startswith(b"id: ") and int(line[4:]) in published:
+                delays.append(received - published[int(line[4:])])
+        if slow:
+            await asyncio.sleep(slow)
+
+
+def publisher(broker, args, published, spent):
+    interval = 1 / args.rate
+    for i in range(args.events):
+        start = time.perf_counter()
+        broker.publish("order.updated", [{"id": i, "status": "shipped", "fleet_id": i % 100}])
+        published[broker.stats()["lastEventId"]] = start
+        spent.append(time.perf_counter() - start)
+        time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+
+async def drive(args):
+    from live import Broker
+
+    broker = Broker(buffer=args.buffer)
+    published, delays, spent = {}, [], []
+    tasks = []
+    for i in range(args.subscribers):
+        stall = args.stall if args.slow and i % args.slow == 0 else 0
+        # Stalled subscribers' delays are theirs alone, so they are not counted
+        tasks.append(asyncio.create_task(subscriber(broker, published, [] if stall else delays, stall)))
+    while broker.stats()["subscribers"] < args.subscribers:
+        await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    await asyncio.to_thread(publisher, broker, args, published, spent)
+    await asyncio.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return broker.stats(), delays, spent, elapsed
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Live event fan-out")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=1000, help="events published per second")
+    parser.add_argument("--buffer", type=int, default=1024, help="SSE_BUFFER")
+    parser.add_argument("--slow", type=int, default=100, help="one stalled subscriber per this many (0: none)")
+    parser.add_argument("--stall", type=float, default=8.0, help="seconds a slow subscriber stalls per chunk")
+    args = parser.parse_args(argv)
+
+    stats, delays, spent, elapsed = asyncio.run(drive(args))
+    print(
+        f"{args.events} events to {args.subscribers} subscribers in {elapsed:.2f}s: "
+        f"{len(delays):,} deliveries ({len(delays) / elapsed:,.0f}/s)"
+    )
+    print(
+        f"publish {sum(spent) / len(spent) * 1e6:.1f} us/event, "
+        f"delivery p50 {percentile(delays, 50) * 1000:.1f} ms, p99 {percentile(delays, 99) * 1000:.1f} ms, "
+        f"{stats['resyncs']} resyncs"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,154 @@
+"""
+Stress test for stock reservation under concurrent orders.
+
+``--clients`` concurrent clients order a handful of products, whose total
+stock is well below the demand, through the single-order webhook and the
+bulk endpoint, and cancel some of the orders they got. Afterwards stock must
+be conserved, never negative, and every accepted order must hold its units:
+
+    sum(products.quantity) + sum(orders.reserved) == initial stock
+
+Prints throughput and latency, and exits with status 1 on any violation.
+
+    python -m benchmarks.inventory --clients 64 --duration 10
+    DB_MODE=async python -m benchmarks.inventory
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+
+from benchmarks.concurrency import percentile, size_write_pool  # noqa: E402
+
+JSON = [("content-type", "application/json")]
+
+
+def seed(products: int, stock: int):
+    from database import engine
+    from models import Base, Product
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Product.__table__.insert(), [{"name": f"Product {i}", "quantity": stock} for i in range(products)])
+
+
+def _order(rng, products):
+    return {
+        "order_name": "Stress",
+        "customer_name": "Stress",
+        "destination": "Lagos",
+        "product_id": rng.randint(1, products),
+        "quantity": rng.randint(1, 3),
+    }
+
+
+async def client(app, call, rng, args, deadline, stats):
+    accepted = []
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if accepted and roll < args.cancel_ratio:
+            order_id = accepted.pop(rng.randrange(len(accepted)))
+            request = ("POST", "/api/update_status/", f"order_id={order_id}&status=cancelled")
+        elif roll < args.cancel_ratio + args.bulk_ratio:
+            body = json.dumps([_order(rng, args.products) for _ in range(args.batch)]).encode()
+            request = ("POST", "/api/orders/webhook/bulk", "", body, JSON)
+        else:
+            request = ("POST", "/api/orders/webhook/", "", json.dumps(_order(rng, args.products)).encode(), JSON)
+        start = time.perf_counter()
+        status, _, body = await call(app, *request)
+        stats["latencies"].append(time.perf_counter() - start)
+        if status == 200 and request[1] == "/api/orders/webhook/":
+            accepted.append(json.loads(body)["id"])
+        elif status == 200 and request[1] == "/api/orders/webhook/bulk":
+            result = json.loads(body)
+            accepted.extend(result["ids"])
+            stats["refused"] += len(result["errors"])
+        elif status == 409:
+            stats["refused"] += 1
+        elif status != 200:
+            stats["errors"].append(status)
+
+
+def check(initial: int):
+    """Returns the violated invariants as strings."""
+    from sqlalchemy import func
+
+    from database import SessionLocal
+    from models import Order, Product
+
+    db = SessionLocal()
+    try:
+        stock = db.query(func.coalesce(func.sum(Product.quantity), 0)).scalar()
+        held = db.query(func.coalesce(func.sum(Order.reserved), 0)).scalar()
+        negative = db.query(Product).filter(Product.quantity < 0).count()
+        unheld = db.query(Order).filter(Order.status != "cancelled", Order.reserved != Order.quantity).count()
+        leaked = db.query(Order).filter(Order.status == "cancelled", Order.reserved != 0).count()
+        orders = db.query(Order).count()
+    finally:
+        db.close()
+    print(f"{orders} orders, {held} units reserved, {stock} in stock of {initial}")
+    violations = []
+    if stock + held != initial:
+        violations.append(f"stock not conserved: {stock} + {held} != {initial}")
+    if negative:
+        violations.append(f"{negative} products with negative stock")
+    if unheld:
+        violations.append(f"{unheld} open orders not holding their quantity")
+    if leaked:
+        violations.append(f"{leaked} cancelled orders still holding stock")
+    return violations
+
+
+async def drive(args):
+    import main
+    from benchmarks.asgi import call
+
+    stats = {"latencies": [], "errors": [], "refused": 0}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(client(main.app, call, random.Random(i), args, deadline, stats) for i in range(args.clients))
+    )
+    elapsed = time.perf_counter() - started
+    await main.dispose_async_engines()
+    return stats, elapsed
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent stock reservation stress test")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--products", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=2_000, help="initial units per product")
+    parser.add_argument("--batch", type=int, default=50, help="orders per bulk request")
+    parser.add_argument("--bulk-ratio", type=float, default=0.05)
+    parser.add_argument("--cancel-ratio", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    size_write_pool()
+    seed(args.products, args.stock)
+    stats, elapsed = asyncio.run(drive(args))
+    latencies = stats["latencies"]
+    print(
+        f"{len(latencies)} requests in {elapsed:.1f}s -> {len(latencies) / elapsed:,.0f} req/s, "
+        f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+        f"{stats['refused']} orders refused"
+    )
+    violations = check(args.products * args.stock)
+    if stats["errors"]:
+        violations.append(f"{len(stats['errors'])} failed requests (statuses {sorted(set(stats['errors']))})")
+    for line in violations:
+        print(f"  {line}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,117 @@
+"""
+Checks that list endpoints issue a fixed number of SQL statements.
+
+Each endpoint is called with a small and a large page; the run fails if the
+larger page needs more statements than the smaller one (an N+1 pattern).
+
+    python -m benchmarks.query_counts
+"""
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-queries-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/queries.db")
+
+from fastapi import Response  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from models import Base, Driver, Fleet, Order, Product, Report, Route, Shipment  # noqa: E402
+from schemas import DriverModel, FleetModel, OrderModel, ProductModel, ReportModel, ShipmentModel  # noqa: E402
+import main  # noqa: E402
+
+ROWS = 60
+
+# endpoint -> response item model, so serialization is counted as well
+LIST_ENDPOINTS = {
+    "read_products": (main.read_products, ProductModel),
+    "read_orders": (main.read_orders, OrderModel),
+    "read_drivers": (main.read_drivers, DriverModel),
+    "read_fleets": (main.read_fleets, FleetModel),
+    "get_reports": (main.get_reports, ReportModel),
+    "read_shipments": (main.read_shipments, ShipmentModel),
+}
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Driver.__table__.insert(), [{"name": f"Driver {i}"} for i in range(ROWS)])
+        conn.execute(
+            Fleet.__table__.insert(),
+            [
+                {
+                    "name": f"Fleet {i}",
+                    # every fifth fleet has no driver assigned
+                    "driver_id": None if i % 5 == 0 else i,
+                    "status": "active",
+                    "vehicle_type": "Truck",
+                    "last_maintenance": "2025-08-01",
+                }
+                for i in range(1, ROWS + 1)
+            ],
+        )
+        conn.execute(Product.__table__.insert(), [{"name": f"Product {i}", "quantity": 10} for i in range(ROWS)])
+        conn.execute(
+            Order.__table__.insert(),
+            [
+                {
+                    "order_name": f"Order {i}",
+                    "product_id": 1,
+                    "customer_name": "Grace Miller",
+                    "destination": "Lagos",
+                    "status": "pending",
+                    "fleet_id": (i % ROWS) + 1,
+                }
+                for i in range(ROWS)
+            ],
+        )
+        conn.execute(
+            Report.__table__.insert(),
+            [{"month": "June 2025", "title": f"Report {i}", "file_url": "/reports/june2025.pdf"} for i in range(ROWS)],
+        )
+        conn.execute(Route.__table__.insert(), [{"name": "Lagos → Abuja"}])
+        conn.execute(
+            Shipment.__table__.insert(),
+            [
+                {"tracking_id": f"TRK{i:06d}", "customer_name": "Grace Miller", "route_id": 1, "status": "shipped"}
+                for i in range(ROWS)
+            ],
+        )
+
+
+def count_queries(fn, schema, **kwargs) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    db = SessionLocal()
+    try:
+        result = fn(response=Response(), db=db, **kwargs)
+        # The fast serialization path returns the encoded response itself
+        if not isinstance(result, Response):
+            [schema.from_orm(item) for item in result]
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def run() -> int:
+    seed()
+    failures = 0
+    for name, (fn, schema) in LIST_ENDPOINTS.items():
+        small = count_queries(fn, schema, skip=0, limit=1)
+        large = count_queries(fn, schema, skip=0, limit=ROWS)
+        ok = large <= small
+        failures += not ok
+        print(f"{name:<15} limit=1: {small:>3}  limit={ROWS}: {large:>3}  {'ok' if ok else 'FAIL'}")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run() else 0)
@@ -0,0 +1,142 @@
+"""
+Checks that the hot queries are served by an index, never a full table scan.
+
+Each hot path runs against a generated database while its SQL is captured.
+Every SELECT is then run through EXPLAIN QUERY PLAN, and the check fails if
+the plan scans ``shipments`` or ``orders`` without an index.
+
+    python -m benchmarks.query_plans
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix="logistics-plans-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/plans.db")
+
+from fastapi import Response  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from database import ReadSessionLocal, engine, read_engine  # noqa: E402
+from pagination import encode_cursor  # noqa: E402
+from schemas import TrackingLookup  # noqa: E402
+import dispatch  # noqa: E402
+import export  # noqa: E402
+import main  # noqa: E402
+import reports  # noqa: E402
+import seeder  # noqa: E402
+
+SCALE = 20_000
+
+# Large tables that must never be read in full on a hot path
+HOT_TABLES = ("shipments", "orders")
+FULL_SCAN = re.compile(rf"^SCAN ({'|'.join(HOT_TABLES)})$")
+
+
+# Every hot path calls the code an endpoint runs, so a query changed there
+# is the query checked here
+
+
+def _recent_shipments(db):
+    main.get_recent_shipments(limit=8, db=db)
+
+
+def _dashboard(db):
+    main.build_dashboard(db)
+
+
+def _orders_page(db):
+    # A later page: the cursor seeks by primary key
+    main.read_orders(Response(), skip=0, limit=100, cursor=encode_cursor(SCALE // 4), db=db)
+
+
+def _shipments_page(db):
+    main.read_shipments(Response(), skip=0, limit=100, cursor=encode_cursor(SCALE // 2), db=db)
+
+
+def _search_orders(db):
+    main.search_orders(Response(), q="lag", skip=0, limit=20, cursor=None, db=db)
+
+
+def _search_orders_past_window(db):
+    # Past the ranked window, pages seek by id
+    main.search_orders(Response(), q="lag", skip=0, limit=20, cursor=encode_cursor({"before": SCALE // 2}), db=db)
+
+
+def _search_shipments(db):
+    main.search_shipments(Response(), q="trk", skip=0, limit=20, cursor=None, db=db)
+
+
+def _track_shipments(db):
+    ids = [seeder.tracking_id(i) for i in range(1, SCALE, SCALE // 50)]
+    main.track_shipments(TrackingLookup(tracking_ids=ids), db=db)
+
+
+def _dispatch_plan(db):
+    dispatch.plan_dispatch(db)
+
+
+def _report_figures(db):
+    reports.collect(date.today().strftime("%Y-%m"))
+
+
+def _export_window(db):
+    for _ in export.stream_shipments("ndjson", "delivered", date.today() - timedelta(days=30), date.today()):
+        pass
+
+
+HOT_PATHS = {
+    "recent_shipments": _recent_shipments,
+    "dashboard": _dashboard,
+    "orders_page": _orders_page,
+    "shipments_page": _shipments_page,
+    "search_orders": _search_orders,
+    "search_orders_past_window": _search_orders_past_window,
+    "search_shipments": _search_shipments,
+    "track_shipments": _track_shipments,
+    "dispatch_plan": _dispatch_plan,
+    "report_figures": _report_figures,
+    "export_window": _export_window,
+}
+
+
+def capture(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    for bound in {engine, read_engine}:
+        event.listen(bound, "before_cursor_execute", record)
+    db = ReadSessionLocal()
+    try:
+        fn(db)
+    finally:
+        db.close()
+        for bound in {engine, read_engine}:
+            event.remove(bound, "before_cursor_execute", record)
+    return statements
+
+
+def run():
+    seeder.generate(SCALE, verbose=False)
+    failed = False
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        for name, fn in HOT_PATHS.items():
+            for statement, parameters in capture(fn):
+                plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+                scans = [line for line in plan if FULL_SCAN.match(line)]
+                failed = failed or bool(scans)
+                print(f"{name:<26} {'FULL SCAN' if scans else 'ok'}")
+                for line in plan:
+                    print(f"    {line}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,338 @@
+"""
+End-to-end API benchmark with regression thresholds.
+
+For every scale factor a fresh database is generated with ``seeder.generate``
+and, in a fresh interpreter, each endpoint scenario below is driven in-process
+by ``--clients`` concurrent clients for ``--duration`` seconds. Throughput,
+p50/p95/p99 latency, SQL statements per request and peak RSS are written as
+JSON to ``--output``.
+
+    python -m benchmarks.suite --scales 1e4,1e5 --output bench.json
+    python -m benchmarks.suite --scales 1e4,1e5 --baseline baseline.json --threshold 0.15
+    python -m benchmarks.suite compare bench.json baseline.json
+
+With ``--baseline`` (or the ``compare`` subcommand) the run exits with status
+1 if any endpoint got slower, lost throughput or used more memory by more than
+``--threshold``, or issues more SQL statements per request than before.
+
+The response cache is disabled unless ``--cache`` is given, so cached
+endpoints are measured by what they cost to build.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.concurrency import percentile
+
+ORDER = {"order_name": "Bench", "customer_name": "Bench", "destination": "Lagos", "product_id": 1}
+REPORT = {"month": "Bench 2026", "title": "Benchmark", "file_url": "/reports/bench.pdf"}
+JSON = [("content-type", "application/json")]
+
+
+def _page(rng, state, path, table):
+    return "GET", path, f"skip={rng.randint(0, max(0, state[table] - 100))}&limit=100"
+
+
+def _report_create(rng, state):
+    return "POST", "/api/reports/", "", json.dumps(REPORT).encode(), JSON
+
+
+def _report_get(rng, state):
+    return "GET", f"/api/reports/{rng.randint(1, state['reports'])}"
+
+
+def _report_delete(rng, state):
+    # Created reports sit above the seeded ones; delete those first
+    report_id = state["reports"]
+    state["reports"] -= 1
+    return "DELETE", f"/api/reports/{report_id}"
+
+
+# Customers re-check the same few parcels; one lookup in ten is for another
+TRACK_HOT_SET = 1000
+
+
+def _track(rng, state):
+    from seeder import tracking_id
+
+    upper = min(TRACK_HOT_SET, state["shipments"]) if rng.random() < 0.9 else state["shipments"]
+    return "GET", f"/api/shipments/track/{tracking_id(rng.randint(1, upper))}"
+
+
+def _track_batch(rng, state):
+    from seeder import tracking_id
+
+    ids = [tracking_id(rng.randint(1, state["shipments"])) for _ in range(1000)]
+    return "POST", "/api/shipments/track", "", json.dumps({"tracking_ids": ids}).encode(), JSON
+
+
+# name -> fn(rng, state) returning call() arguments. Run in this order, so
+# report_delete removes what report_create added.
+SCENARIOS = {
+    "webhook": lambda rng, state: ("POST", "/api/orders/webhook/", "", json.dumps(ORDER).encode(), JSON),
+    "read_products": lambda rng, state: _page(rng, state, "/api/products/", "products"),
+    "read_orders": lambda rng, state: _page(rng, state, "/api/orders/", "orders"),
+    "read_drivers": lambda rng, state: _page(rng, state, "/api/drivers/", "drivers"),
+    "read_fleets": lambda rng, state: _page(rng, state, "/api/fleets/", "fleets"),
+    "read_shipments": lambda rng, state: _page(rng, state, "/api/shipments/", "shipments"),
+    "get_dashboard": lambda rng, state: ("GET", "/api/dashboard"),
+    "get_top_routes": lambda rng, state: ("GET", "/api/routes/top"),
+    "get_recent_shipments": lambda rng, state: ("GET", "/api/shipments/recent"),
+    "track_shipment": _track,
+    "track_batch": _track_batch,
+    "get_reports": lambda rng, state: _page(rng, state, "/api/reports/", "reports"),
+    "report_create": _report_create,
+    "report_get": _report_get,
+    "report_delete": _report_delete,
+}
+
+# Metric -> True when a higher value is better
+METRICS = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _counts(state):
+    from database import SessionLocal
+    from models import Driver, Fleet, Order, Product, Report, Shipment
+
+    db = SessionLocal()
+    try:
+        for key, model in (
+            ("products", Product),
+            ("orders", Order),
+            ("drivers", Driver),
+            ("fleets", Fleet),
+            ("shipments", Shipment),
+            ("reports", Report),
+        ):
+            state[key] = db.query(model).count()
+    finally:
+        db.close()
+
+
+def _restock():
+    # Seeded stock runs out within seconds of webhook orders, and refused
+    # orders would be timed (and counted as errors) instead of created
+    from database import engine
+    from models import Product
+
+    with engine.begin() as conn:
+        conn.execute(Product.__table__.update().where(Product.id == ORDER["product_id"]).values(quantity=10**9))
+
+
+async def _scenario(app, call, make, args, state):
+    latencies = []
+    errors = 0
+
+    async def client(rng, deadline):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            if make is _report_delete and state["reports"] <= state["seeded_reports"]:
+                return
+            request = make(rng, state)
+            start = time.perf_counter()
+            status, _, _ = await call(app, *request)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(random.Random(i), deadline) for i in range(args.clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def _drive(args):
+    from sqlalchemy import event
+
+    from database import engine, read_engine
+    from benchmarks.asgi import call
+    import main
+
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    for bound in {engine, read_engine}:
+        event.listen(bound, "before_cursor_execute", count)
+
+    state = {}
+    _counts(state)
+    state["seeded_reports"] = state["reports"]
+    results = {}
+    for name in args.scenarios:
+        if name == "report_get":
+            _counts(state)
+        statements = 0
+        latencies, errors, elapsed = await _scenario(main.app, call, SCENARIOS[name], args, state)
+        requests = len(latencies)
+        results[name] = {
+            "requests": requests,
+            "errors": errors,
+            "rps": requests / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "queries_per_request": statements / requests if requests else 0.0,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+    await main.dispose_async_engines()
+    return results
+
+
+def run_scale(args):
+    """Runs in the child interpreter: seeds, drives every scenario, prints JSON."""
+    import seeder
+
+    started = time.perf_counter()
+    seeder.generate(args.scale, seed=args.seed, verbose=False)
+    seed_s = time.perf_counter() - started
+    _restock()
+    results = asyncio.run(_drive(args))
+    print(json.dumps({"scale": args.scale, "seed_s": seed_s, "endpoints": results}))
+
+
+def compare(current, baseline, threshold: float):
+    """Returns the regressions of ``current`` against ``baseline`` as strings."""
+    regressions = []
+    for scale, run in current["scales"].items():
+        base_run = baseline["scales"].get(scale)
+        if base_run is None:
+            continue
+        for endpoint, metrics in run["endpoints"].items():
+            base = base_run["endpoints"].get(endpoint)
+            if base is None:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                new, old = metrics[metric], base[metric]
+                if not old:
+                    continue
+                change = (new - old) / old
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(f"{scale} {endpoint} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+            # Statement counts are deterministic, so any increase is a regression
+            if metrics["queries_per_request"] > base["queries_per_request"] + 0.5:
+                regressions.append(
+                    f"{scale} {endpoint} queries_per_request: "
+                    f"{base['queries_per_request']:.1f} -> {metrics['queries_per_request']:.1f}"
+                )
+    return regressions
+
+
+def _report(regressions, threshold):
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {threshold:.0%}")
+    return 0
+
+
+def _print_table(results):
+    print(f"{'scale':>9} {'endpoint':<22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8} {'rss MB':>7}")
+    for scale, run in results["scales"].items():
+        for endpoint, r in run["endpoints"].items():
+            print(
+                f"{scale:>9} {endpoint:<22} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                f"{r['p99_ms']:>8.1f} {r['queries_per_request']:>8.1f} {r['peak_rss_mb']:>7.0f}"
+                + (f"  {r['errors']} errors" if r["errors"] else "")
+            )
+
+
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="benchmarks.suite compare")
+        parser.add_argument("current")
+        parser.add_argument("baseline")
+        parser.add_argument("--threshold", type=float, default=0.2)
+        args = parser.parse_args(argv[1:])
+        with open(args.current) as f:
+            current = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        sys.exit(_report(compare(current, baseline, args.threshold), args.threshold))
+
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark")
+    parser.add_argument("--scales", default="1e4,1e5", help="comma-separated shipment counts")
+    parser.add_argument("--scale", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per endpoint")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative change, e.g. 0.2")
+    args = parser.parse_args(argv)
+    args.scenarios = [name for name in SCENARIOS if name in args.scenarios.split(",")]
+
+    if args.scale is not None:
+        args.scale = int(args.scale)
+        run_scale(args)
+        return
+
+    results = {
+        "meta": {
+            "date": date.today().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clients": args.clients,
+            "duration": args.duration,
+            "seed": args.seed,
+            "cache": args.cache,
+        },
+        "scales": {},
+    }
+    for scale in (int(float(s)) for s in args.scales.split(",")):
+        tmpdir = tempfile.mkdtemp(prefix="logistics-suite-")
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmpdir}/bench.db"}
+        if not args.cache:
+            env["RESPONSE_CACHE_SIZE"] = "0"
+        child = [
+            "--scale", str(scale),
+            "--clients", str(args.clients),
+            "--duration", str(args.duration),
+            "--seed", str(args.seed),
+            "--scenarios", ",".join(args.scenarios),
+        ]
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", *child],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        run_result = json.loads(out.strip().splitlines()[-1])
+        results["scales"][str(scale)] = {"seed_s": run_result["seed_s"], "endpoints": run_result["endpoints"]}
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    _print_table(results)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        sys.exit(_report(compare(results, baseline, args.threshold), args.threshold))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,121 @@
+"""
+Single-order webhook throughput, ORDER_INGEST=direct versus group.
+
+``--clients`` concurrent partners post one order per request for
+``--duration`` seconds against the app in-process. Without --ingest both
+modes run in turn, each in a fresh interpreter on a fresh database; with it
+only that mode runs, on a scratch database unless DATABASE_URL is set.
+
+    python -m benchmarks.webhook --clients 64 --duration 10
+    python -m benchmarks.webhook --batch-size 200 --flush-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.concurrency import percentile, size_write_pool
+
+MODES = ("direct", "group")
+ORDER = {"order_name": "Bench", "customer_name": "Bench", "destination": "Lagos", "quantity": 1}
+
+
+def seed(products: int):
+    from database import engine
+    from models import Base, Product
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Product.__table__.insert(), [{"name": f"Product {i}", "quantity": 10**9} for i in range(products)])
+
+
+async def client(app, call, rng, args, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        body = json.dumps({**ORDER, "product_id": rng.randint(1, args.products)}).encode()
+        start = time.perf_counter()
+        status, _, _ = await call(app, "POST", "/api/orders/webhook/", "", body, [("content-type", "application/json")])
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+
+
+async def drive(args):
+    import main
+    from benchmarks.asgi import call
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(client(main.app, call, random.Random(i), args, deadline, latencies, errors) for i in range(args.clients))
+    )
+    elapsed = time.perf_counter() - started
+    main.flush_order_queue()
+    await main.dispose_async_engines()
+    return latencies, errors, elapsed, main.order_queue.stats()
+
+
+def run_mode(args):
+    # ``database`` and ``order_queue`` read these when first imported, so
+    # they are set before anything imports them
+    os.environ["ORDER_INGEST"] = args.ingest
+    if args.batch_size is not None:
+        os.environ["ORDER_BATCH_SIZE"] = str(args.batch_size)
+    if args.flush_ms is not None:
+        os.environ["ORDER_FLUSH_MS"] = str(args.flush_ms)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='logistics-bench-')}/bench.db")
+    size_write_pool()
+    seed(args.products)
+    latencies, errors, elapsed, queue = asyncio.run(drive(args))
+    print(
+        json.dumps(
+            {
+                "ingest": args.ingest,
+                "requests": len(latencies),
+                "rps": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "errors": len(errors),
+                "mean_batch": queue["mean_batch"],
+            }
+        )
+    )
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="Single-order webhook throughput, direct vs group commit")
+    parser.add_argument("--ingest", choices=MODES)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, help="ORDER_BATCH_SIZE for group mode")
+    parser.add_argument("--flush-ms", type=float, help="ORDER_FLUSH_MS for group mode")
+    args = parser.parse_args(argv)
+
+    if args.ingest:
+        run_mode(args)
+        return
+
+    forwarded = argv if argv is not None else sys.argv[1:]
+    print(f"{'ingest':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.webhook", "--ingest", mode, *forwarded],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:>7} {r['rps']:>8.0f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['mean_batch']:>6.1f}")
+        if r["errors"]:
+            print(f"{mode:>7} {r['errors']} failed requests")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,225 @@
+"""
+In-process response cache for the GET endpoints the frontend polls.
+
+Entries are whole serialized responses, kept in an LRU with a TTL and tagged
+with the tables they were built from. A commit that writes one of those
+tables drops the matching entries straight away: ORM writes are picked up
+by the session hooks below, and code that writes through Core calls
+``response_cache.invalidate`` itself.
+
+Every cached response carries an ETag and Last-Modified, so polling clients
+that send If-None-Match / If-Modified-Since get an empty 304 back.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+
+CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+
+
+class _Entry:
+    __slots__ = ("status", "headers", "body", "etag", "last_modified", "tags", "expires")
+
+    def __init__(self, status, headers, body, etag, last_modified, tags, expires):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.tags = tags
+        self.expires = expires
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._modified = {}
+        self._started = time.time()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def versions(self, tags):
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def last_modified(self, tags) -> float:
+        with self._lock:
+            return max([self._started] + [self._modified.get(tag, 0) for tag in tags])
+
+    def put(self, key, entry: _Entry, versions):
+        """Stores ``entry`` unless one of its tags was invalidated since ``versions``."""
+        with self._lock:
+            if tuple(self._versions.get(tag, 0) for tag in entry.tags) != versions:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        tags = set(tags)
+        now = time.time()
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                self._modified[tag] = now
+            stale = [key for key, entry in self._entries.items() if tags & entry.tags]
+            for key in stale:
+                del self._entries[key]
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "notModified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _record_written_tables(session, flush_context):
+    tables = session.info.setdefault("written_tables", set())
+    for obj in session.new | session.dirty | session.deleted:
+        tables.add(inspect(obj).mapper.local_table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        response_cache.invalidate(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop("written_tables", None)
+
+
+def _matches(entry: _Entry, headers: Headers) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or entry.etag in [t.strip() for t in if_none_match.split(",")]
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(entry.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ResponseCacheMiddleware:
+    """
+    Serves GET requests for ``routes`` (path -> tables it reads) from
+    ``cache``. Everything else passes straight through.
+    """
+
+    def __init__(self, app, routes, cache: ResponseCache = response_cache):
+        self.app = app
+        self.routes = routes
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        tags = frozenset(self.routes[scope["path"]])
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True)))
+        key = f"{scope['path']}?{query}"
+        request_headers = Headers(scope=scope)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            await self._send(entry, request_headers, send, "HIT")
+            return
+
+        versions = self.cache.versions(tags)
+        last_modified = self.cache.last_modified(tags)
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        entry = _Entry(
+            start["status"],
+            headers,
+            body,
+            '"' + hashlib.sha1(body).hexdigest() + '"',
+            last_modified,
+            tags,
+            time.monotonic() + self.cache.ttl,
+        )
+        if entry.status == 200:
+            self.cache.put(key, entry, versions)
+            await self._send(entry, request_headers, send, "MISS")
+        else:
+            await send({"type": "http.response.start", "status": start["status"], "headers": start.get("headers", [])})
+            await send({"type": "http.response.body", "body": body})
+
+    async def _send(self, entry: _Entry, request_headers: Headers, send, outcome: str):
+        headers = [
+            (b"etag", entry.etag.encode()),
+            (b"last-modified", formatdate(entry.last_modified, usegmt=True).encode()),
+            (b"cache-control", b"no-cache"),
+            (b"x-cache", outcome.encode()),
+        ]
+        if _matches(entry, request_headers):
+            self.cache.record_not_modified()
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = entry.headers + headers + [(b"content-length", str(len(entry.body)).encode())]
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
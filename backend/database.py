@@ -1,9 +1,136 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./logistics.db")
+
+# "sync" serves every endpoint from the blocking engine below; "async" swaps
+# the hot endpoints for async versions running on ASYNC_DATABASE_URL.
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+# Any SQLAlchemy async driver works here, e.g. postgresql+asyncpg://...
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# PRAGMAs applied to every new SQLite connection. "production" lets readers
+# run alongside the single writer (WAL), waits on locks instead of failing
+# with "database is locked", and keeps hot pages in memory. Any value can be
+# overridden with SQLITE_<PRAGMA>, e.g. SQLITE_BUSY_TIMEOUT=10000.
+STORAGE_PROFILES = {
+    "default": {},
+    "production": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # negative = KiB, i.e. 64 MiB per connection
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+STORAGE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+SQLITE_PRAGMAS = dict(STORAGE_PROFILES[STORAGE_PROFILE])
+for _pragma in ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store"):
+    if f"SQLITE_{_pragma.upper()}" in os.environ:
+        SQLITE_PRAGMAS[_pragma] = os.environ[f"SQLITE_{_pragma.upper()}"]
+
+# Writes go through a small pool since SQLite only admits one writer at a
+# time; read-only endpoints get their own, larger pool.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "4"))
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Keeps each IN list well under SQLite's bound-parameter limit
+IN_CHUNK = 500
+
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+_is_memory = _is_sqlite and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:")
+
+
+def in_chunks(values, size=IN_CHUNK):
+    """Splits ``values`` into lists short enough for one IN (...)."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
 
-DATABASE_URL = "sqlite:///./logistics.db"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _apply_pragmas(engine, read_only: bool = False):
+    if not _is_sqlite:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if name == "journal_mode" and _is_memory:
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _engine(pool_size: int, max_overflow: int, read_only: bool = False):
+    kwargs = {}
+    if _is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_memory:
+        # SQLAlchemy 1.4 defaults file-based SQLite to NullPool, which reopens
+        # the file (and drops its page cache) on every checkout
+        kwargs.update(
+            poolclass=QueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=POOL_TIMEOUT,
+        )
+    new_engine = create_engine(DATABASE_URL, **kwargs)
+    _apply_pragmas(new_engine, read_only)
+    return new_engine
+
+
+engine = _engine(POOL_SIZE, MAX_OVERFLOW)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+if _is_memory:
+    # Each in-memory connection is a separate database, so reads must share it
+    read_engine = engine
+else:
+    read_engine = _engine(READ_POOL_SIZE, READ_MAX_OVERFLOW, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
+
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    def _async_engine(pool_size: int, max_overflow: int, read_only: bool = False):
+        kwargs = {}
+        if not _is_memory:
+            kwargs.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=POOL_TIMEOUT,
+            )
+        new_engine = create_async_engine(ASYNC_DATABASE_URL, **kwargs)
+        _apply_pragmas(new_engine.sync_engine, read_only)
+        return new_engine
+
+    async_engine = _async_engine(POOL_SIZE, MAX_OVERFLOW)
+    async_read_engine = async_engine if _is_memory else _async_engine(READ_POOL_SIZE, READ_MAX_OVERFLOW, True)
+    AsyncSessionLocal = sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    AsyncReadSessionLocal = sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
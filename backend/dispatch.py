@@ -0,0 +1,242 @@
+"""
+Set-based order updates and the automatic dispatch planner.
+
+A batch of (order id, value) pairs is grouped by value and applied as one
+``UPDATE ... WHERE id IN (...)`` per distinct value, all in one commit, so a
+thousand scans cost a handful of statements instead of a thousand commits.
+"""
+import heapq
+from collections import defaultdict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+from database import in_chunks
+from models import Fleet, Order
+import inventory
+import live
+
+
+def _existing_ids(db: Session, ids):
+    found = set()
+    for chunk in in_chunks(ids):
+        found.update(db.execute(select(Order.id).where(Order.id.in_(chunk))).scalars())
+    return found
+
+
+def _apply(db: Session, targets: dict, values_for, before_commit=None):
+    """
+    ``targets`` maps order id -> new value (last one wins for duplicates).
+    ``before_commit(by_value)`` runs inside the transaction, with the
+    existing ids grouped by their new value. Returns (updated count, sorted
+    missing ids).
+    """
+    existing = _existing_ids(db, targets)
+    missing = sorted(set(targets) - existing)
+
+    by_value = defaultdict(list)
+    for order_id, value in targets.items():
+        if order_id in existing:
+            by_value[value].append(order_id)
+
+    try:
+        for value, ids in by_value.items():
+            for chunk in in_chunks(ids):
+                db.execute(
+                    update(Order)
+                    .where(Order.id.in_(chunk))
+                    .values(**values_for(value))
+                    .execution_options(synchronize_session=False)
+                )
+        if before_commit is not None:
+            before_commit(by_value)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if by_value:
+        response_cache.invalidate(Order.__tablename__)
+        live.broker.publish(
+            "order.updated",
+            ({"id": order_id, **values_for(value)} for value, ids in by_value.items() for order_id in ids),
+        )
+    return len(existing), missing
+
+
+def assign_fleets(db: Session, assignments):
+    """``assignments`` is an iterable of (order_id, fleet_id)."""
+    targets = dict(assignments)
+    return _apply(db, targets, lambda fleet_id: {"fleet_id": fleet_id, "status": "assigned"})
+
+
+def update_statuses(db: Session, updates):
+    """``updates`` is an iterable of (order_id, status)."""
+    targets = dict(updates)
+
+    def release_cancelled(by_value):
+        inventory.release(db, by_value.get(inventory.CANCELLED, ()))
+
+    return _apply(db, targets, lambda status: {"status": status}, release_cancelled)
+
+
+# Orders a fleet can carry at once, by Fleet.vehicle_type
+VEHICLE_CAPACITY = {"Truck": 40, "Airplane": 120, "Car": 10, "Motorcycle": 4}
+DEFAULT_CAPACITY = 10
+
+# Orders in these states still occupy their fleet
+OPEN_STATUSES = ("assigned", "shipped")
+
+
+class Plan:
+    def __init__(self):
+        self.assignments = []  # (order_id, fleet_id)
+        self.unassigned = []
+        self.loads = {}  # fleet_id -> (orders planned, capacity left)
+
+
+def _available_fleets(db: Session):
+    """
+    Active fleets with a driver, at most one per driver, with capacity left.
+    A driver who already has open orders is only offered the fleet they are
+    out with.
+    """
+    load = {}
+    out_with = {}  # driver_id -> the fleet carrying most of their open orders
+    rows = (
+        db.query(Fleet.driver_id, Order.fleet_id, func.count(Order.id))
+        .join(Fleet, Order.fleet_id == Fleet.id)
+        .filter(Order.status.in_(OPEN_STATUSES))
+        .group_by(Order.fleet_id)
+        .all()
+    )
+    for driver_id, fleet_id, count in rows:
+        load[fleet_id] = count
+        if count > load.get(out_with.get(driver_id), 0):
+            out_with[driver_id] = fleet_id
+    rows = (
+        db.query(Fleet.id, Fleet.driver_id, Fleet.vehicle_type)
+        .join(Fleet.driver)
+        .filter(Fleet.status == "active")
+        .order_by(Fleet.id)
+        .all()
+    )
+    fleets = {}
+    for fleet_id, driver_id, vehicle_type in rows:
+        if out_with.get(driver_id, fleet_id) != fleet_id:
+            continue
+        capacity = VEHICLE_CAPACITY.get(vehicle_type, DEFAULT_CAPACITY) - load.get(fleet_id, 0)
+        # A driver can only be out with one vehicle; keep their roomiest one
+        if capacity > 0 and capacity > fleets.get(driver_id, (None, 0))[1]:
+            fleets[driver_id] = (fleet_id, capacity)
+    return list(fleets.values())
+
+
+def _budgets(fleets, total: int):
+    """
+    Splits ``min(total, free capacity)`` orders over ``fleets`` in proportion
+    to their free capacity. Shares are rounded down and the orders left over
+    go one each to the largest remainders, fleets that got none first, so
+    the budgets add up exactly and no fleet is left idle while another takes
+    a rounded-up share.
+    """
+    room = sum(capacity for _, capacity in fleets)
+    if total >= room:
+        return dict(fleets)
+    exact = {fleet_id: capacity * total / room for fleet_id, capacity in fleets}
+    budgets = {fleet_id: int(share) for fleet_id, share in exact.items()}
+    leftover = total - sum(budgets.values())
+    by_remainder = sorted(budgets, key=lambda f: (budgets[f] > 0, budgets[f] - exact[f], f))
+    for fleet_id in by_remainder[:leftover]:
+        budgets[fleet_id] += 1
+    return budgets
+
+
+def plan_dispatch(db: Session) -> Plan:
+    """
+    Assigns every pending order to an available fleet in one greedy pass.
+
+    Each fleet gets a budget proportional to its free capacity, scaled so
+    the budgets add up to the pending orders (see ``_budgets``); loads
+    therefore stay even when there is slack. Orders are grouped by destination, largest group
+    first, and each group is poured into whichever fleet has the most budget
+    left (a max-heap), so a destination is spread over as few fleets as
+    possible. Runs in O(D log D + A log F) for D destinations, A
+    assignments and F fleets.
+    """
+    by_destination = defaultdict(list)
+    # No ORDER BY, so SQLite reads the covering status index instead of
+    # walking the whole table in id order; ids are sorted per group below
+    pending = db.query(Order.id, Order.destination).filter(Order.status == "pending")
+    total = 0
+    for order_id, destination in pending:
+        by_destination[destination].append(order_id)
+        total += 1
+    for orders in by_destination.values():
+        orders.sort()
+
+    fleets = _available_fleets(db)
+    capacity = dict(fleets)
+    heap = [(-budget, fleet_id) for fleet_id, budget in _budgets(fleets, total).items() if budget]
+    heapq.heapify(heap)
+
+    plan = Plan()
+    planned = defaultdict(int)
+    for destination in sorted(by_destination, key=lambda d: -len(by_destination[d])):
+        orders = by_destination[destination]
+        start = 0
+        while start < len(orders) and heap:
+            negative_budget, fleet_id = heapq.heappop(heap)
+            take = min(-negative_budget, len(orders) - start)
+            plan.assignments.extend((order_id, fleet_id) for order_id in orders[start : start + take])
+            planned[fleet_id] += take
+            start += take
+            if take < -negative_budget:
+                heapq.heappush(heap, (negative_budget + take, fleet_id))
+        plan.unassigned.extend(orders[start:])
+
+    plan.loads = {fleet_id: (count, capacity[fleet_id] - count) for fleet_id, count in planned.items()}
+    return plan
+
+
+def commit_plan(db: Session, plan: Plan):
+    """
+    Applies ``plan`` as one UPDATE per fleet, skipping orders that stopped
+    being pending since the plan was made. Returns the number of orders assigned.
+    """
+    by_fleet = defaultdict(list)
+    for order_id, fleet_id in plan.assignments:
+        by_fleet[fleet_id].append(order_id)
+    assigned = []  # (order id, fleet id)
+    try:
+        for fleet_id, ids in by_fleet.items():
+            for chunk in in_chunks(ids):
+                result = db.execute(
+                    update(Order)
+                    # status || '' keeps SQLite on the primary key: with the
+                    # status index available it would otherwise walk every
+                    # pending order once per chunk
+                    .where(Order.id.in_(chunk), Order.status.concat("") == "pending")
+                    .values(fleet_id=fleet_id, status="assigned")
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount < len(chunk):
+                    # Some were skipped; the rest are now assigned to this
+                    # fleet (an order that already was only repeats its state)
+                    chunk = db.execute(
+                        select(Order.id).where(
+                            Order.id.in_(chunk), Order.fleet_id == fleet_id, Order.status == "assigned"
+                        )
+                    ).scalars().all()
+                assigned.extend((order_id, fleet_id) for order_id in chunk)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if assigned:
+        response_cache.invalidate(Order.__tablename__)
+        live.broker.publish(
+            "order.updated",
+            ({"id": order_id, "status": "assigned", "fleet_id": fleet_id} for order_id, fleet_id in assigned),
+        )
+    return len(assigned)
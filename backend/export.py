@@ -0,0 +1,112 @@
+"""
+Streaming NDJSON/CSV exports of whole tables.
+
+Rows are read as plain column tuples with ``yield_per`` and encoded in
+batches, so memory stays flat however many rows the export covers. Each
+export opens its own session because the generator outlives the request
+handler that created the response.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+
+from database import ReadSessionLocal
+from models import Order, Shipment
+
+BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+ORDER_COLUMNS = (
+    Order.id,
+    Order.order_name,
+    Order.product_id,
+    Order.customer_name,
+    Order.destination,
+    Order.quantity,
+    Order.reserved,
+    Order.status,
+    Order.fleet_id,
+)
+
+SHIPMENT_COLUMNS = (
+    Shipment.id,
+    Shipment.tracking_id,
+    Shipment.customer_name,
+    Shipment.route_id,
+    Shipment.status,
+    Shipment.revenue,
+    Shipment.shipped_at,
+    Shipment.created_at,
+)
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode(rows, names, fmt: str):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        batch = 0
+        for row in rows:
+            writer.writerow([_jsonable(v) for v in row])
+            batch += 1
+            if batch == BATCH_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                batch = 0
+        yield buffer.getvalue().encode()
+        return
+
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({n: _jsonable(v) for n, v in zip(names, row)}, ensure_ascii=False))
+        if len(lines) == BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _stream(columns, filters, fmt: str):
+    names = [c.key for c in columns]
+    db = ReadSessionLocal()
+    try:
+        query = db.query(*columns).filter(*filters).order_by(columns[0]).yield_per(BATCH_SIZE)
+        yield from _encode(query, names, fmt)
+    finally:
+        db.close()
+
+
+def stream_orders(fmt: str, status: str = None):
+    filters = [Order.status == status] if status else []
+    return _stream(ORDER_COLUMNS, filters, fmt)
+
+
+def stream_shipments(fmt: str, status: str = None, since: date = None, until: date = None):
+    """``since`` and ``until`` bound the created_at day, both inclusive."""
+    filters = []
+    if status:
+        filters.append(Shipment.status == status)
+    if since is not None:
+        filters.append(Shipment.created_at >= datetime.combine(since, time.min))
+    if until is not None:
+        filters.append(Shipment.created_at < datetime.combine(until + timedelta(days=1), time.min))
+    return _stream(SHIPMENT_COLUMNS, filters, fmt)
@@ -0,0 +1,111 @@
+"""
+Streams files from disk with HTTP Range support and validator headers.
+
+Starlette's FileResponse always sends the whole file. ``file_response``
+answers ``Range: bytes=...`` requests with 206 and only the requested bytes
+(resumable downloads, PDF viewers fetching pages), honours If-Range, and
+turns a matching If-None-Match into an empty 304. The body is read in
+CHUNK_SIZE pieces on the event loop, so a large download holds no
+threadpool worker while the client drains it.
+"""
+import os
+from email.utils import formatdate
+
+import anyio
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+# For files whose name changes whenever their content does
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range(header: str, size: int):
+    """
+    Returns the (start, end) byte offsets, end inclusive, asked for by a
+    ``Range`` header, or None when the whole file should be sent: no header,
+    another unit, or several ranges (rare, and a full 200 is always valid).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes=") :].strip()
+    if "," in spec:
+        return None
+    first, sep, last = spec.partition("-")
+    try:
+        if not sep:
+            raise ValueError
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start < 0 or (last and start > end):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(f"Range starts past the end of a {size} byte file")
+    return start, min(end, size - 1)
+
+
+async def _read(path: str, start: int, length: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: str,
+    filename: str = None,
+    cache_control: str = IMMUTABLE,
+    headers: dict = None,
+):
+    stat = os.stat(path)
+    size = stat.st_size
+    headers = {
+        **(headers or {}),
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    # If-Range: only send part of the file if it is still the version the
+    # client holds the rest of
+    if request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        start, length, status = 0, size, 200
+    else:
+        start, end = byte_range
+        length, status = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_read(path, start, length), status_code=status, media_type=media_type, headers=headers)
@@ -0,0 +1,135 @@
+"""
+Batch order ingestion for the storefront webhook.
+
+Payloads are validated item by item so one bad order does not reject the
+batch. Stock for every valid order is then reserved (see inventory.py) and
+the orders that got it are written with chunked multi-row INSERTs, all in a
+single transaction.
+"""
+import json
+from functools import lru_cache
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+import inventory
+import live
+from models import Order
+from schemas import OrderCreate
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# 7 bound parameters per order keeps a chunk well under SQLite's
+# SQLITE_MAX_VARIABLE_NUMBER (32766 since 3.32)
+CHUNK_SIZE = 1000
+
+COLUMNS = ("order_name", "product_id", "customer_name", "destination", "status", "quantity", "reserved")
+
+
+# Error type reported for an order that could not be reserved
+REJECTED = {
+    inventory.UnknownProduct: "value_error.product.missing",
+    inventory.OutOfStock: "value_error.stock.insufficient",
+}
+
+
+class PayloadError(ValueError):
+    pass
+
+
+def _items(body: bytes, content_type: str):
+    if content_type.split(";")[0].strip().lower() in NDJSON_TYPES:
+        for line in body.splitlines():
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield e
+        return
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise PayloadError("Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise PayloadError("Body must be a JSON array or NDJSON")
+    yield from items
+
+
+def parse_orders(body: bytes, content_type: str = "application/json"):
+    """
+    Returns (rows, errors): insertable column dicts with the index of the
+    item they came from, and per-item errors for the rest.
+    """
+    rows = []
+    errors = []
+    for index, item in enumerate(_items(body, content_type)):
+        if isinstance(item, ValueError):
+            errors.append({"index": index, "errors": [{"msg": f"Invalid JSON: {item}"}]})
+            continue
+        try:
+            order = OrderCreate.parse_obj(item)
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors()})
+            continue
+        rows.append((index, {**order.dict(), "status": "pending"}))
+    return rows, errors
+
+
+@lru_cache(maxsize=8)
+def _insert_sql(rows: int) -> str:
+    # Compiling a multi-row VALUES clause through SQLAlchemy costs more than
+    # executing it, so the statement text is built once per chunk length.
+    placeholders = "(" + ", ".join("?" * len(COLUMNS)) + ")"
+    return f"INSERT INTO {Order.__tablename__} ({', '.join(COLUMNS)}) VALUES " + ", ".join(
+        [placeholders] * rows
+    )
+
+
+def reserve_and_insert(db: Session, rows):
+    """
+    Reserves stock for validated rows and inserts the ones that got it, in
+    one transaction. Returns (ids, rejected): the new ids in input order,
+    and (index, error) for every row whose product is unknown or out of
+    stock.
+    """
+    ids = []
+    rejected = []
+    try:
+        failed = inventory.reserve(db, [(values["product_id"], values["quantity"]) for _, values in rows])
+        reserved = []
+        for (index, values), error in zip(rows, failed):
+            if error is None:
+                reserved.append((index, {**values, "reserved": values["quantity"]}))
+            else:
+                rejected.append((index, error))
+        rows = reserved
+        connection = db.connection()
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start : start + CHUNK_SIZE]
+            params = tuple(values[column] for _, values in chunk for column in COLUMNS)
+            result = connection.exec_driver_sql(_insert_sql(len(chunk)), params)
+            # A single multi-row INSERT into an INTEGER PRIMARY KEY table gets
+            # consecutive rowids while it holds the write lock, ending at lastrowid
+            last = result.lastrowid
+            ids.extend(range(last - len(chunk) + 1, last + 1))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if ids:
+        response_cache.invalidate(Order.__tablename__)
+        live.broker.publish(
+            "order.created",
+            (live.order_fields({**values, "id": order_id}) for (_, values), order_id in zip(rows, ids)),
+        )
+    return ids, rejected
+
+
+def insert_orders(db: Session, rows):
+    """``reserve_and_insert`` with the rejections as per-item errors."""
+    ids, rejected = reserve_and_insert(db, rows)
+    return ids, [
+        {"index": index, "errors": [{"loc": ["product_id"], "msg": str(error), "type": REJECTED[type(error)]}]}
+        for index, error in rejected
+    ]
@@ -0,0 +1,110 @@
+"""
+Stock reservation for new orders, and its release on cancellation.
+
+Every order reserves ``quantity`` units of its product in the transaction
+that inserts it, so stock can never be oversold. Reservations never read
+the stock into Python: each one is a conditional decrement,
+
+    UPDATE products SET quantity = quantity - n WHERE id = ? AND quantity >= n
+
+which SQLite applies atomically under its write lock, so concurrent orders
+cannot lose each other's updates. ``reserve`` takes a whole batch of
+demands and issues one such statement per product for their total. Only if
+a product cannot cover the total are its demands retried one at a time, in
+arrival order, so as many orders as the stock allows still get through.
+A product whose decrement fails is looked up once, so an order for a
+product that does not exist is told apart from one that is short of stock.
+
+The units an order holds are kept in ``Order.reserved``. Cancelling an
+order returns them to stock and zeroes ``reserved`` in the same
+transaction, so a second cancel releases nothing.
+"""
+from collections import defaultdict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from database import in_chunks
+from models import Order, Product
+
+CANCELLED = "cancelled"
+
+
+class OutOfStock(ValueError):
+    def __init__(self, product_id: int):
+        super().__init__(f"Insufficient stock for product {product_id}")
+        self.product_id = product_id
+
+
+class UnknownProduct(ValueError):
+    def __init__(self, product_id: int):
+        super().__init__(f"Product {product_id} not found")
+        self.product_id = product_id
+
+
+def _decrement(connection, product_id: int, units: int) -> bool:
+    result = connection.execute(
+        update(Product.__table__)
+        .where(Product.id == product_id, Product.quantity >= units)
+        .values(quantity=Product.quantity - units)
+    )
+    return result.rowcount == 1
+
+
+def _exists(connection, product_id: int) -> bool:
+    return connection.execute(select(Product.id).where(Product.id == product_id)).first() is not None
+
+
+def reserve(db: Session, demands):
+    """
+    ``demands`` is a list of (product_id, units), one per order. Decrements
+    stock inside ``db``'s transaction and returns one entry per demand: None
+    if it was reserved, else the OutOfStock or UnknownProduct it failed with.
+    The caller commits or rolls back.
+    """
+    connection = db.connection()
+    by_product = defaultdict(list)
+    for i, (product_id, units) in enumerate(demands):
+        by_product[product_id].append(i)
+    failed = [None] * len(demands)
+    for product_id, indexes in by_product.items():
+        if _decrement(connection, product_id, sum(demands[i][1] for i in indexes)):
+            continue
+        if not _exists(connection, product_id):
+            for i in indexes:
+                failed[i] = UnknownProduct(product_id)
+            continue
+        for i in indexes:
+            if len(indexes) == 1 or not _decrement(connection, product_id, demands[i][1]):
+                failed[i] = OutOfStock(product_id)
+    return failed
+
+
+def reserve_one(db: Session, product_id: int, units: int):
+    """``reserve`` for one order; raises OutOfStock or UnknownProduct if it cannot be covered."""
+    error = reserve(db, [(product_id, units)])[0]
+    if error is not None:
+        raise error
+
+
+def release(db: Session, order_ids):
+    """
+    Returns the units held by ``order_ids`` to stock and clears their
+    reservations, inside ``db``'s transaction. Both statements write, so
+    they read the reservations under the write lock.
+    """
+    connection = db.connection()
+    for chunk in in_chunks(order_ids):
+        held = (
+            select(func.sum(Order.reserved))
+            .where(Order.product_id == Product.id, Order.id.in_(chunk))
+            .scalar_subquery()
+        )
+        connection.execute(
+            update(Product.__table__)
+            .where(Product.id.in_(select(Order.product_id).where(Order.id.in_(chunk), Order.reserved > 0)))
+            .values(quantity=Product.quantity + held)
+        )
+        connection.execute(
+            update(Order.__table__).where(Order.id.in_(chunk), Order.reserved > 0).values(reserved=0)
+        )
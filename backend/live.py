@@ -0,0 +1,201 @@
+"""
+Live order, shipment and fleet changes, pushed to browsers as server-sent events.
+
+Every committed change is published once to ``broker``: new orders and
+status or fleet changes (through the ORM, ``ingest.insert_orders`` or the
+set-based updates in dispatch.py), and inserted, updated or deleted
+shipments and fleets. ``publish`` encodes the event a single time into a ring of the
+last SSE_BUFFER events, and wakes every subscriber with one callback on the
+event loop, however many there are.
+
+Each ``/api/events`` client reads the ring through its own cursor, so its
+buffer is the ring window: at most SSE_BUFFER events behind. Publishers
+never wait for subscribers. A client that falls further behind (a slow
+connection whose writes are blocked by flow control) gets a ``resync``
+event, meaning "refetch what you show", and carries on from the newest
+event. Event ids let a reconnecting EventSource resume with Last-Event-ID.
+"""
+import asyncio
+import os
+import threading
+from collections import deque
+from itertools import groupby, islice
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+import serialization
+from models import Fleet, Order, Shipment
+
+SSE_BUFFER = int(os.getenv("SSE_BUFFER", "1024"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Sent once per connection: how long EventSource waits before reconnecting
+RETRY_MS = 2000
+
+TOPICS = ("order", "shipment", "fleet")
+
+ORDER_FIELDS = ("id", "order_name", "customer_name", "destination", "product_id", "quantity", "status", "fleet_id")
+SHIPMENT_FIELDS = ("id", "tracking_id", "route_id", "status")
+FLEET_FIELDS = ("id", "name", "driver_id", "status", "vehicle_type", "last_maintenance")
+
+
+def _encode(seq: int, kind: str, data) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (seq, kind.encode(), serialization.dumps(data))
+
+
+class Broker:
+    def __init__(self, buffer: int = SSE_BUFFER, heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        self.heartbeat = heartbeat
+        self._events = deque(maxlen=buffer)  # (seq, topic, encoded)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._loop = None
+        self._wakeup = None
+        self._wake_pending = False
+        self.subscribers = 0
+        self.published = 0
+        self.resyncs = 0
+
+    def publish(self, kind: str, items):
+        """Publishes one ``kind`` event ("order.created", ...) per dict in ``items``. Thread-safe."""
+        items = list(items)
+        if not items:
+            return
+        topic = kind.split(".", 1)[0]
+        with self._lock:
+            self.published += len(items)
+            if not self.subscribers:
+                # Nobody to encode for; a client resuming across the gap resyncs
+                self._seq += len(items)
+                self._events.clear()
+                return
+            for data in items:
+                self._seq += 1
+                self._events.append((self._seq, topic, _encode(self._seq, kind, data)))
+            loop = self._loop
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:  # the loop has closed
+            with self._lock:
+                self._wake_pending = False
+
+    def _wake(self):
+        with self._lock:
+            self._wake_pending = False
+            wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def _read(self, cursor: int):
+        """(events after ``cursor``, whether any were lost, newest seq, wakeup)."""
+        with self._lock:
+            oldest = self._events[0][0] if self._events else self._seq + 1
+            lost = cursor + 1 < oldest and cursor < self._seq
+            start = max(0, cursor + 1 - oldest)
+            return list(islice(self._events, start, None)), lost, self._seq, self._wakeup
+
+    async def stream(self, topics=TOPICS, last_event_id: int = None):
+        """The SSE body for one client, until it disconnects."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop, self._wakeup = loop, asyncio.Event()
+            self.subscribers += 1
+            cursor = self._seq if last_event_id is None else min(last_event_id, self._seq)
+        try:
+            yield b"retry: %d\n\n" % RETRY_MS
+            while True:
+                events, lost, newest, wakeup = self._read(cursor)
+                if lost:
+                    with self._lock:
+                        self.resyncs += 1
+                    cursor = newest
+                    yield b"id: %d\nevent: resync\ndata: {}\n\n" % newest
+                    continue
+                if events:
+                    cursor = events[-1][0]
+                    chunk = b"".join(encoded for _, topic, encoded in events if topic in topics)
+                    if chunk:
+                        yield chunk
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # A comment line keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self.subscribers -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": self.subscribers,
+                "published": self.published,
+                "resyncs": self.resyncs,
+                "buffered": len(self._events),
+                "lastEventId": self._seq,
+            }
+
+
+broker = Broker()
+
+
+def order_fields(values: dict) -> dict:
+    """The ``order.created`` payload for an inserted row's column values."""
+    return {name: values.get(name) for name in ORDER_FIELDS}
+
+
+# ORM writes are queued on the session and published once it commits, so
+# subscribers never see a change that was rolled back
+
+
+def _pending(target):
+    session = object_session(target)
+    return session.info.setdefault("live_events", []) if session is not None else None
+
+
+@event.listens_for(Order, "after_insert")
+def _on_order_insert(mapper, connection, target):
+    pending = _pending(target)
+    if pending is not None:
+        pending.append(("order.created", {name: getattr(target, name) for name in ORDER_FIELDS}))
+
+
+@event.listens_for(Order, "after_update")
+def _on_order_update(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.status.history.has_changes() or state.attrs.fleet_id.history.has_changes()):
+        return
+    pending = _pending(target)
+    if pending is not None:
+        pending.append(("order.updated", {"id": target.id, "status": target.status, "fleet_id": target.fleet_id}))
+
+
+def _on_row(kind, fields):
+    def listener(mapper, connection, target):
+        pending = _pending(target)
+        if pending is not None:
+            pending.append((kind, {name: getattr(target, name) for name in fields}))
+
+    return listener
+
+
+for _model, _topic, _fields in ((Shipment, "shipment", SHIPMENT_FIELDS), (Fleet, "fleet", FLEET_FIELDS)):
+    event.listen(_model, "after_insert", _on_row(f"{_topic}.created", _fields))
+    event.listen(_model, "after_update", _on_row(f"{_topic}.updated", _fields))
+    event.listen(_model, "after_delete", _on_row(f"{_topic}.deleted", _fields))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for kind, events in groupby(session.info.pop("live_events", ()), key=lambda e: e[0]):
+        broker.publish(kind, [data for _, data in events])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session):
+    session.info.pop("live_events", None)
@@ -1,13 +1,45 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.routing import APIRoute
+import asyncio
 import os
-from collections import Counter, defaultdict
+from datetime import date
+from typing import Literal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine
+from database import (
+    DB_MODE,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+    async_engine,
+    async_read_engine,
+    engine,
+)
 from models import Base, Order, Product, Fleet, Driver, Report, Shipment, Route
 from schemas import *
+from cache import ResponseCacheMiddleware, response_cache
+import analytics
+import assets
+import dispatch
+import export
+import files
+import ingest
+import inventory
+import live
+import metrics
+import migrations
+from order_queue import ORDER_INGEST, order_queue
+import reports
+import rollups
+import search
+import serialization
+import tracking
+from pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, paginate, paginate_async
 
 Base.metadata.create_all(bind=engine)
 
@@ -17,14 +49,67 @@ origins = [
     "*",  # <-- allow all (if you're testing, remove in prod!)
 ]
 
+# Polled GET endpoints and the tables each one reads; registered before
+# CORS so cached responses still get per-request CORS headers
+app.add_middleware(
+    ResponseCacheMiddleware,
+    routes={
+        "/api/dashboard": ("shipments", "routes"),
+        "/api/fleets/": ("fleets", "drivers"),
+        "/api/reports/": ("reports",),
+    },
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,  # Allow cookies and other credentials to be sent with requests
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Allow all headers to be sent in the request
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],  # Let browser clients read the cursor and ETag
 )
 
+# Outermost, so cached responses and CORS preflights are timed as well
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.on_event("startup")
+def build_assets():
+    assets.load()
+
+
+@app.on_event("startup")
+def migrate_indexes():
+    migrations.upgrade(engine)
+
+
+@app.on_event("startup")
+def backfill_rollups():
+    db = SessionLocal()
+    try:
+        rollups.ensure_built(db)
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def resume_reports():
+    db = SessionLocal()
+    try:
+        reports.resume(db)
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+def stop_report_workers():
+    reports.shutdown()
+
+
+@app.on_event("shutdown")
+def flush_order_queue():
+    order_queue.stop()
+
 
 def get_db():
     db = SessionLocal()
@@ -34,14 +119,36 @@ def get_db():
         db.close()
 
 
-# Serve static files from ./frontend
-app.mount("/static", StaticFiles(directory="."), name="static")
+def get_read_db():
+    """Session on the read-only connection pool, for endpoints that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _fast_page(query, column, response: Response, cursor, skip: int, limit: int):
+    """``paginate`` for a column query, encoded without per-row validation."""
+    rows = paginate(query, column, response, cursor, skip, limit)
+    return serialization.json_response(serialization.as_dicts(rows), response)
+
+
+# The frontend, built by assets.py: hashed files under /static/, pages at
+# their own names and index.html at root
+@app.get("/", include_in_schema=False)
+def read_index(request: Request):
+    return assets.serve(request, "/")
 
 
-# Serve index.html at root
-@app.get("/")
-def read_index():
-    return FileResponse("index.html")
+@app.get("/static/{path:path}", include_in_schema=False)
+def read_static(path: str, request: Request):
+    return assets.serve(request, f"/static/{path}")
+
+
+@app.get("/{page}.html", include_in_schema=False)
+def read_page(page: str, request: Request):
+    return assets.serve(request, f"/{page}.html")
 
 
 @app.post("/api/products/", response_model=ProductModel)
@@ -54,26 +161,110 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/api/products/", response_model=list[ProductModel])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = db.query(Product).offset(skip).limit(limit).all()
+def read_products(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(ProductModel, Product))
+        return _fast_page(query, Product.id, response, cursor, skip, limit)
+    products = paginate(db.query(Product), Product.id, response, cursor, skip, limit)
     return products
 
 
 @app.post("/api/orders/webhook/", response_model=OrderModel)
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    db_order = Order(**order.dict())
+    """
+    Creates the order and reserves its stock; 422 if the product does not
+    exist, 409 if it cannot cover ``quantity``.
+    """
+    try:
+        inventory.reserve_one(db, order.product_id, order.quantity)
+    except inventory.UnknownProduct as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except inventory.OutOfStock as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db_order = Order(**order.dict(), reserved=order.quantity)
     db.add(db_order)
     db.commit()
     db.refresh(db_order)
     return db_order
 
 
+@app.post("/api/orders/webhook/bulk", response_model=BulkOrderResponse)
+async def create_orders_bulk(request: Request, db: Session = Depends(get_db)):
+    """
+    Accepts a JSON array or an NDJSON stream (Content-Type:
+    application/x-ndjson) of orders. Valid orders are inserted in one
+    transaction; ``ids`` lists their new ids in input order and ``errors``
+    reports the index of every rejected item.
+    """
+    body = await request.body()
+    try:
+        rows, errors = ingest.parse_orders(body, request.headers.get("content-type", ""))
+    except ingest.PayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ids, rejected = await run_in_threadpool(ingest.insert_orders, db, rows)
+    return {"ids": ids, "errors": sorted(errors + rejected, key=lambda e: e["index"])}
+
+
 @app.get("/api/orders/", response_model=list[OrderModel])
-def read_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    orders = db.query(Order).offset(skip).limit(limit).all()
+def read_orders(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(OrderModel, Order))
+        return _fast_page(query, Order.id, response, cursor, skip, limit)
+    orders = paginate(db.query(Order), Order.id, response, cursor, skip, limit)
     return orders
 
 
+def _search(db: Session, model, item_model, response: Response, q: str, skip: int, limit: int, cursor):
+    # Ranked results are not ordered by id, so inside the ranked window the
+    # cursor carries an offset; past it, {"before": id} (see search.py)
+    before = None
+    if cursor is not None:
+        position = decode_cursor(cursor)
+        if isinstance(position, dict) and isinstance(position.get("before"), int):
+            before = position["before"]
+        elif isinstance(position, int) and position >= 0:
+            skip = position
+        else:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    query = db.query(*serialization.columns(item_model, model)) if serialization.FAST else db.query(model)
+    try:
+        rows, position = search.search(query, model, q, skip, limit, before)
+    except search.SearchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if position is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(position)
+    if serialization.FAST:
+        return serialization.json_response(serialization.as_dicts(rows), response)
+    return rows
+
+
+@app.get("/api/orders/search", response_model=list[OrderModel])
+def search_orders(
+    response: Response,
+    q: str,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Orders whose name, customer or destination match every word of ``q`` by prefix, best first."""
+    return _search(db, Order, OrderModel, response, q, skip, limit, cursor)
+
+
 @app.post("/api/fleets/", response_model=FleetModel)
 def create_fleet(fleet: FleetCreate, db: Session = Depends(get_db)):
     db_fleet = Fleet(**fleet.dict())
@@ -84,11 +275,29 @@ def create_fleet(fleet: FleetCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/api/fleets/", response_model=list[FleetModel])
-def read_fleets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    fleets = db.query(Fleet).offset(skip).limit(limit).all()
-    for fleet in fleets:
-        driver_name = db.query(Driver).filter(Driver.id == fleet.driver_id).first().name
+def read_fleets(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(FleetModel, Fleet, driver_name=Driver.name)).outerjoin(Fleet.driver)
+        return _fast_page(query, Fleet.id, response, cursor, skip, limit)
+    rows = paginate(
+        db.query(Fleet, Driver.name).outerjoin(Fleet.driver),
+        Fleet.id,
+        response,
+        cursor,
+        skip,
+        limit,
+        key=lambda row: row[0].id,
+    )
+    fleets = []
+    for fleet, driver_name in rows:
         fleet.driver_name = driver_name
+        fleets.append(fleet)
     return fleets
 
 
@@ -102,14 +311,23 @@ def create_driver(driver: DriverCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/api/drivers/", response_model=list[DriverModel])
-def read_drivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    drivers = db.query(Driver).offset(skip).limit(limit).all()
+def read_drivers(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(DriverModel, Driver))
+        return _fast_page(query, Driver.id, response, cursor, skip, limit)
+    drivers = paginate(db.query(Driver), Driver.id, response, cursor, skip, limit)
     return drivers
 
 
 @app.post("/api/assign_fleet/")
-def assign_fleet(order_id: str, fleet_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.order_id == order_id).first()
+def assign_fleet(order_id: int, fleet_id: int, db: Session = Depends(get_db)):
+    order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -120,32 +338,102 @@ def assign_fleet(order_id: str, fleet_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/api/update_status/")
-def update_status(order_id: str, status: str, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.order_id == order_id).first()
+def update_status(order_id: int, status: str, db: Session = Depends(get_db)):
+    order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     order.status = status
+    if status == inventory.CANCELLED:
+        inventory.release(db, [order_id])
     db.commit()
     return {"message": "Order status updated successfully"}
 
 
+@app.post("/api/assign_fleet/bulk", response_model=BulkUpdateResponse)
+def assign_fleet_bulk(assignments: list[FleetAssignment], db: Session = Depends(get_db)):
+    updated, missing = dispatch.assign_fleets(db, ((a.order_id, a.fleet_id) for a in assignments))
+    return {"updated": updated, "missing": missing}
+
+
+@app.post("/api/update_status/bulk", response_model=BulkUpdateResponse)
+def update_status_bulk(updates: list[StatusUpdate], db: Session = Depends(get_db)):
+    updated, missing = dispatch.update_statuses(db, ((u.order_id, u.status) for u in updates))
+    return {"updated": updated, "missing": missing}
+
+
+@app.post("/api/dispatch/", response_model=DispatchResponse)
+def run_dispatch(commit: bool = True, db: Session = Depends(get_db)):
+    """
+    Plans assignments for every pending order across active fleets and,
+    unless ``commit=false`` (dry run), applies them in one transaction.
+    """
+    plan = dispatch.plan_dispatch(db)
+    assigned = dispatch.commit_plan(db, plan) if commit else len(plan.assignments)
+    fleets = [
+        {"fleet_id": fleet_id, "orders": orders, "remaining_capacity": remaining}
+        for fleet_id, (orders, remaining) in sorted(plan.loads.items())
+    ]
+    return {
+        "assigned": assigned,
+        "unassigned": len(plan.unassigned),
+        "committed": commit,
+        "fleets": fleets,
+    }
+
+
 @app.post("/api/reports/", response_model=ReportModel)
 def create_report(report: ReportCreate, db: Session = Depends(get_db)):
-    new_report = Report(**report.dict())
+    """
+    Stores a report. Without a ``file_url`` the report is "queued" and its
+    ``format`` file is generated in the background; poll the report until
+    its status is "done" (file_url set) or "failed" (see ``error``).
+    """
+    if report.file_url:
+        new_report = Report(month=report.month, title=report.title, file_url=report.file_url, status=reports.DONE)
+    else:
+        try:
+            reports.parse_month(report.month)
+        except reports.ReportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        new_report = Report(
+            month=report.month, title=report.title, file_url="", status=reports.QUEUED, format=report.format
+        )
     db.add(new_report)
     db.commit()
     db.refresh(new_report)
+    if new_report.status == reports.QUEUED:
+        reports.submit(new_report.id, new_report.month, new_report.format)
     return new_report
 
 
 @app.get("/api/reports/", response_model=list[ReportModel])
-def get_reports(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(Report).offset(skip).limit(limit).all()
+def get_reports(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(ReportModel, Report))
+        return _fast_page(query, Report.id, response, cursor, skip, limit)
+    return paginate(db.query(Report), Report.id, response, cursor, skip, limit)
+
+
+@app.get("/api/reports/files/{name}")
+def get_report_file(name: str, request: Request):
+    path = reports.file_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Report file not found")
+    # The name ends in a hash of the content, so it doubles as a strong ETag
+    etag = '"' + name.rsplit("-", 1)[1].split(".")[0] + '"'
+    media_type = reports.FORMATS[name.rsplit(".", 1)[1]]
+    return files.file_response(request, path, media_type, etag, filename=name)
 
 
 @app.get("/api/reports/{report_id}", response_model=ReportModel)
-def get_report(report_id: int, db: Session = Depends(get_db)):
+def get_report(report_id: int, db: Session = Depends(get_read_db)):
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -157,59 +445,99 @@ def delete_report(report_id: int, db: Session = Depends(get_db)):
     report = db.query(Report).filter(Report.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
+    url = report.file_url
     db.delete(report)
     db.commit()
+    reports.remove_file(url)
     return {"message": "Report deleted successfully"}
 
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/api/tracking/stats")
+def get_tracking_stats():
+    return tracking.tracker.stats()
+
+
+@app.get("/api/events")
+async def stream_events(request: Request, topics: str = ",".join(live.TOPICS)):
+    """
+    Server-sent events for new orders, order status and fleet changes, and
+    shipment and fleet writes (see live.py). ``topics`` is a comma-separated
+    subset of "order", "shipment" and "fleet".
+    """
+    wanted = tuple(t for t in topics.split(",") if t in live.TOPICS)
+    if not wanted:
+        raise HTTPException(status_code=400, detail=f"topics must name at least one of {', '.join(live.TOPICS)}")
+    last_event_id = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        live.broker.stream(wanted, int(last_event_id) if last_event_id.isdigit() else None),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: stop nginx-style proxies holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/events/stats")
+def get_event_stats():
+    return live.broker.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/dashboard", response_model=DashboardResponse)
-def get_dashboard(db: Session = Depends(get_db), months_count: int = 6):
+def get_dashboard(db: Session = Depends(get_read_db), months_count: int = 6):
     """
     Returns:
       - KPIs (total orders, deliveries, pending, revenue)
       - Charts data (months array, shipments per month, status counts [delivered, delayed])
       - Tables: recent shipments and top routes
     """
-    shipments: list[Shipment] = db.query(Shipment).order_by(Shipment.shipped_at).all()
+    if serialization.FAST:
+        return serialization.json_response(build_dashboard(db, months_count))
+    return build_dashboard(db, months_count)
 
-    # KPIs
-    total_orders = len(shipments)
-    deliveries = sum(1 for s in shipments if s.status.lower() == "delivered")
-    pending = sum(1 for s in shipments if s.status.lower() == "pending")
-    revenue = sum((s.revenue or 0.0) for s in shipments)
+
+def _recent_shipments(db: Session, limit: int):
+    columns = serialization.columns(ShipmentModel, Shipment)
+    return serialization.as_dicts(db.query(*columns).order_by(Shipment.created_at.desc()).limit(limit).all())
+
+
+def build_dashboard(db: Session, months_count: int = 6):
+    # KPIs and status counts from the precomputed rollups
+    total_orders, deliveries, pending, delayed_count, revenue = rollups.totals(db)
 
     # Charts: last N months (includes months with 0)
     now = datetime.utcnow()
-    months = []
+    month_starts = []
     for i in range(months_count - 1, -1, -1):
-        m = (now.replace(day=1) - __relativedelta_months(i)).strftime("%b %Y")
-        months.append(m)
+        month_starts.append(now.replace(day=1) - __relativedelta_months(i))
+    months = [m.strftime("%b %Y") for m in month_starts]
 
     # Count shipments per month:
-    # map "Mon YYYY" -> count
-    month_counts = defaultdict(int)
-    for s in shipments:
-        if s.shipped_at:
-            key = s.shipped_at.strftime("%b %Y")
-            month_counts[key] += 1
+    # map "YYYY-MM" -> count
+    month_counts = rollups.monthly_counts(db, [m.strftime("%Y-%m") for m in month_starts])
 
-    shipments_per_month = [month_counts.get(m, 0) for m in months]
+    shipments_per_month = [month_counts.get(m.strftime("%Y-%m"), 0) for m in month_starts]
 
     # status counts: delivered vs delayed (if you want on-time vs delayed)
-    delivered_count = sum(1 for s in shipments if s.status.lower() == "delivered")
-    delayed_count = sum(1 for s in shipments if s.status.lower() == "delayed")
-    status_counts = [delivered_count, delayed_count]
+    status_counts = [deliveries, delayed_count]
 
     # Recent Shipments (latest 8)
-    recent_q = db.query(Shipment).order_by(Shipment.created_at.desc()).limit(8).all()
-    recent_shipments = [ShipmentModel.from_orm(s) for s in recent_q]
+    if serialization.FAST:
+        recent_shipments = _recent_shipments(db, 8)
+    else:
+        recent_q = db.query(Shipment).order_by(Shipment.created_at.desc()).limit(8).all()
+        recent_shipments = [ShipmentModel.from_orm(s) for s in recent_q]
 
     # Top routes
-    route_counter = Counter()
-    for s in shipments:
-        route_name = s.route.name if s.route else "Unknown"
-        route_counter[route_name] += 1
-    top_routes = [{"route": r, "count": c} for r, c in route_counter.most_common(6)]
+    top_routes = rollups.top_routes(db, 6)
 
     return {
         "kpis": {
@@ -255,20 +583,295 @@ def __relativedelta_months(months: int):
     return _RD(months)
 
 
+def _export_response(request: Request, chunks, name: str, fmt: str):
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = export.gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(chunks, media_type=export.MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.get("/api/export/orders")
+def export_orders(
+    request: Request,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    status: Optional[str] = None,
+):
+    return _export_response(request, export.stream_orders(fmt, status), "orders", fmt)
+
+
+@app.get("/api/export/shipments")
+def export_shipments(
+    request: Request,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    status: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+):
+    chunks = export.stream_shipments(fmt, status, since, until)
+    return _export_response(request, chunks, "shipments", fmt)
+
+
 # Optional smaller endpoints
+@app.get("/api/shipments/", response_model=list[ShipmentModel])
+def read_shipments(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if serialization.FAST:
+        query = db.query(*serialization.columns(ShipmentModel, Shipment))
+        return _fast_page(query, Shipment.id, response, cursor, skip, limit)
+    return paginate(db.query(Shipment), Shipment.id, response, cursor, skip, limit)
+
+
+@app.get("/api/shipments/search", response_model=list[ShipmentModel])
+def search_shipments(
+    response: Response,
+    q: str,
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Shipments whose tracking id or customer match every word of ``q`` by prefix, best first."""
+    return _search(db, Shipment, ShipmentModel, response, q, skip, limit, cursor)
+
+
+@app.get("/api/shipments/track/{tracking_id}", response_model=ShipmentModel)
+def track_shipment(tracking_id: str, db: Session = Depends(get_read_db)):
+    found, _ = tracking.tracker.lookup(db, [tracking_id])
+    if not found:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    if serialization.FAST:
+        return serialization.json_response(found[tracking_id])
+    return found[tracking_id]
+
+
+@app.post("/api/shipments/track", response_model=TrackingLookupResponse)
+def track_shipments(lookup: TrackingLookup, db: Session = Depends(get_read_db)):
+    """
+    Batch lookup for partner integrations: up to 1000 tracking ids, answered
+    in request order with duplicates dropped; unknown ids are listed in ``missing``.
+    """
+    tracking_ids = list(dict.fromkeys(lookup.tracking_ids))
+    found, missing = tracking.tracker.lookup(db, tracking_ids)
+    result = {"shipments": [found[t] for t in tracking_ids if t in found], "missing": missing}
+    if serialization.FAST:
+        return serialization.json_response(result)
+    return result
+
+
 @app.get("/api/shipments/recent", response_model=list[ShipmentModel])
-def get_recent_shipments(limit: int = 8, db: Session = Depends(get_db)):
+def get_recent_shipments(limit: int = 8, db: Session = Depends(get_read_db)):
+    if serialization.FAST:
+        return serialization.json_response(_recent_shipments(db, limit))
     q = db.query(Shipment).order_by(Shipment.created_at.desc()).limit(limit).all()
     return [ShipmentModel.from_orm(s) for s in q]
 
 
 @app.get("/api/routes/top")
-def get_top_routes(limit: int = 6, db: Session = Depends(get_db)):
-    shipments = db.query(Shipment).all()
-    from collections import Counter
-
-    counter = Counter()
-    for s in shipments:
-        name = s.route.name if s.route else "Unknown"
-        counter[name] += 1
-    return [{"route": r, "count": c} for r, c in counter.most_common(limit)]
+def get_top_routes(
+    limit: int = 6,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    return rollups.top_routes(db, limit, since=since, until=until, status=status)
+
+
+@app.get("/api/analytics")
+def get_analytics(
+    group_by: Optional[str] = None,
+    bucket: Optional[Literal["day", "week", "month"]] = None,
+    metrics: str = "count,revenue",
+    status: Optional[str] = None,
+    route_id: Optional[int] = None,
+    customer: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    rolling: Optional[int] = None,
+    sort: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=100_000),
+):
+    """
+    Ad-hoc shipment aggregates from the in-memory columnar snapshot, e.g.
+    revenue by route by week:  ?group_by=route&bucket=week&metrics=revenue
+    delayed rate per customer: ?group_by=customer&metrics=count,delayed_rate&sort=-delayed_rate
+    rolling 30-day delivered:  ?bucket=day&rolling=30&metrics=delivered&since=2025-01-01
+    """
+    try:
+        result = analytics.query(
+            group_by, bucket, metrics, status, route_id, customer, since, until, rolling, sort, limit
+        )
+    except analytics.AnalyticsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.json_response(result)
+
+
+# Async versions of the hot endpoints, served instead of the sync ones above
+# when DB_MODE=async. They run on the event loop against async_engine, so
+# slow reads no longer tie up threadpool workers that writes need.
+async_router = APIRouter()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
+@async_router.post("/api/orders/webhook/", response_model=OrderModel)
+async def create_order_async(order: OrderCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        await db.run_sync(inventory.reserve_one, order.product_id, order.quantity)
+    except inventory.UnknownProduct as e:
+        await db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except inventory.OutOfStock as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    db_order = Order(**order.dict(), reserved=order.quantity)
+    db.add(db_order)
+    await db.commit()
+    await db.refresh(db_order)
+    return db_order
+
+
+@async_router.post("/api/orders/webhook/bulk", response_model=BulkOrderResponse)
+async def create_orders_bulk_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    body = await request.body()
+    try:
+        rows, errors = ingest.parse_orders(body, request.headers.get("content-type", ""))
+    except ingest.PayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ids, rejected = await db.run_sync(ingest.insert_orders, rows)
+    return {"ids": ids, "errors": sorted(errors + rejected, key=lambda e: e["index"])}
+
+
+@async_router.post("/api/assign_fleet/")
+async def assign_fleet_async(order_id: int, fleet_id: int, db: AsyncSession = Depends(get_async_db)):
+    order = await db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    order.fleet_id = fleet_id
+    order.status = "assigned"
+    await db.commit()
+    return {"message": "Order assigned to fleet successfully"}
+
+
+@async_router.post("/api/update_status/")
+async def update_status_async(order_id: int, status: str, db: AsyncSession = Depends(get_async_db)):
+    order = await db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    order.status = status
+    if status == inventory.CANCELLED:
+        await db.run_sync(inventory.release, [order_id])
+    await db.commit()
+    return {"message": "Order status updated successfully"}
+
+
+def _async_list(path: str, model, item_model):
+    async def read_items(
+        response: Response,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_read_db),
+    ):
+        if serialization.FAST:
+            stmt = select(*serialization.columns(item_model, model))
+            rows = await paginate_async(db, stmt, model.id, response, cursor, skip, limit)
+            return serialization.json_response(serialization.as_dicts(rows), response)
+        return await paginate_async(db, select(model), model.id, response, cursor, skip, limit)
+
+    read_items.__name__ = f"read_{model.__tablename__}_async"
+    async_router.add_api_route(path, read_items, methods=["GET"], response_model=list[item_model])
+
+
+_async_list("/api/products/", Product, ProductModel)
+_async_list("/api/orders/", Order, OrderModel)
+_async_list("/api/drivers/", Driver, DriverModel)
+_async_list("/api/reports/", Report, ReportModel)
+_async_list("/api/shipments/", Shipment, ShipmentModel)
+
+
+@async_router.get("/api/fleets/", response_model=list[FleetModel])
+async def read_fleets_async(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    if serialization.FAST:
+        stmt = select(*serialization.columns(FleetModel, Fleet, driver_name=Driver.name)).outerjoin(Fleet.driver)
+        rows = await paginate_async(db, stmt, Fleet.id, response, cursor, skip, limit)
+        return serialization.json_response(serialization.as_dicts(rows), response)
+    stmt = select(Fleet, Driver.name).outerjoin(Fleet.driver)
+    rows = await paginate_async(
+        db, stmt, Fleet.id, response, cursor, skip, limit, key=lambda row: row[0].id
+    )
+    fleets = []
+    for fleet, driver_name in rows:
+        fleet.driver_name = driver_name
+        fleets.append(fleet)
+    return fleets
+
+
+@async_router.get("/api/dashboard", response_model=DashboardResponse)
+async def get_dashboard_async(db: AsyncSession = Depends(get_async_read_db), months_count: int = 6):
+    dashboard = await db.run_sync(build_dashboard, months_count)
+    if serialization.FAST:
+        return serialization.json_response(dashboard)
+    return dashboard
+
+
+@app.on_event("shutdown")
+async def dispose_async_engines():
+    # Pooled aiosqlite connections each own a worker thread
+    if async_engine is not None:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+
+# ORDER_INGEST=group: single webhook orders go through the group-commit
+# queue (order_queue.py), in either DB_MODE
+group_router = APIRouter()
+
+
+@group_router.post("/api/orders/webhook/", response_model=OrderModel)
+async def create_order_grouped(order: OrderCreate):
+    try:
+        return await asyncio.wrap_future(order_queue.submit(order))
+    except inventory.UnknownProduct as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except inventory.OutOfStock as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+def _override_routes(router: APIRouter):
+    replaced = {(r.path, m) for r in router.routes for m in r.methods}
+    app.router.routes = [
+        r
+        for r in app.router.routes
+        if not (isinstance(r, APIRoute) and any((r.path, m) in replaced for m in r.methods))
+    ]
+    app.include_router(router)
+
+
+if DB_MODE == "async":
+    _override_routes(async_router)
+if ORDER_INGEST == "group":
+    _override_routes(group_router)
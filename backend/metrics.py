@@ -0,0 +1,203 @@
+"""
+Per-route request metrics, exposed in Prometheus text format at /metrics.
+
+For every request the middleware records the latency histogram plus what
+the request spent in the database: SQL statements issued, time inside the
+driver, and ORM rows hydrated into model instances. Latency minus SQL time is
+roughly what went to Python (ORM and serialization).
+
+Statements taking longer than SLOW_QUERY_MS are logged to the
+``logistics.slow_query`` logger, with their EXPLAIN QUERY PLAN on SQLite.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.routing import Match
+
+from database import (
+    Base,
+    DATABASE_URL,
+    async_engine,
+    async_read_engine,
+    engine,
+    read_engine,
+)
+
+# Histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Unset or 0 turns the slow-query log off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0") or 0)
+
+slow_query_log = logging.getLogger("logistics.slow_query")
+
+
+class _RequestStats:
+    __slots__ = ("statements", "sql_seconds", "rows")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "statements", "sql_seconds", "rows")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: _RequestStats):
+        key = (method, route, str(status))
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics()
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[i] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.statements += stats.statements
+            metrics.sql_seconds += stats.sql_seconds
+            metrics.rows += stats.rows
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route, status), m in routes:
+                labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                for bound, count in zip(LATENCY_BUCKETS, m.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.seconds}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+            for name, help_text, attr in (
+                ("http_request_sql_statements_total", "SQL statements issued.", "statements"),
+                ("http_request_sql_seconds_total", "Time spent executing SQL.", "sql_seconds"),
+                ("http_request_orm_rows_total", "ORM instances hydrated from result rows.", "rows"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for (method, route, status), m in routes:
+                    labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+                    lines.append(f"{name}{{{labels}}} {getattr(m, attr)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(cursor, statement, parameters, executemany, elapsed)
+
+
+def _log_slow_query(cursor, statement, parameters, executemany, elapsed):
+    message = f"{elapsed * 1000:.1f} ms: {statement}"
+    explainable = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+    if DATABASE_URL.startswith("sqlite") and explainable and not executemany:
+        try:
+            plan = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            message += "\n" + "\n".join(f"  {detail}" for _, _, _, detail in plan)
+        except Exception as exc:  # the plan is best-effort; never fail the query
+            message += f"\n  (no plan: {exc})"
+    slow_query_log.warning(message)
+
+
+def _on_load(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+
+
+for _engine in {engine, read_engine}:
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+for _engine in {async_engine, async_read_engine} - {None}:
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(Base, "load", _on_load, propagate=True)
+
+
+def _route_path(scope) -> str:
+    # Label by the route template, not the raw path, to keep cardinality bounded
+    endpoint = scope.get("endpoint")
+    for route in scope["app"].routes:
+        if endpoint is not None:
+            if getattr(route, "endpoint", None) is endpoint:
+                return route.path
+        elif route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records every HTTP request into ``registry``."""
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            self.registry.observe(scope["method"], _route_path(scope), status, elapsed, stats)
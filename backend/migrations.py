@@ -0,0 +1,71 @@
+"""
+Brings the columns and indexes of an existing database in line with models.py.
+
+``create_all`` only creates missing tables, so columns and indexes added to a
+model never reach a database created before them. ``upgrade`` adds every
+column the models declare that the database lacks (new columns must be
+nullable or have a server default), builds every missing index, drops the
+ones listed in OBSOLETE_INDEXES, and builds the full-text search tables if
+they are missing (see search.py). Existing rows are never rewritten. It
+runs on app startup and can be run by hand:
+
+    python migrations.py
+"""
+import argparse
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from database import Base, engine
+import models  # noqa: F401  registers the tables on Base.metadata
+import search
+
+# Indexes that earlier versions of models.py created and nothing queries by
+OBSOLETE_INDEXES = {
+    "fleets": ("ix_fleets_vehicle_type", "ix_fleets_last_maintenance"),
+}
+
+
+def upgrade(bind: Engine = engine):
+    """
+    Returns (added, created, dropped): "table.column" for every added
+    column, and the names of the indexes and search tables created and the
+    indexes dropped.
+    """
+    added, created, dropped = [], [], []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    added.append(f"{table.name}.{column.name}")
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+            for name in OBSOLETE_INDEXES.get(table.name, ()):
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                    dropped.append(name)
+        created += search.ensure_index(conn)
+        if created and bind.dialect.name == "sqlite":
+            # Refresh planner statistics so the new indexes get picked
+            conn.execute(text("ANALYZE"))
+    return added, created, dropped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add missing columns and indexes and drop obsolete indexes.")
+    parser.parse_args()
+    added, created, dropped = upgrade()
+    print(f"Added {len(added)} column(s): {', '.join(added) or '-'}")
+    print(f"Created {len(created)} index(es): {', '.join(created) or '-'}")
+    print(f"Dropped {len(dropped)} index(es): {', '.join(dropped) or '-'}")
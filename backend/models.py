@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -13,10 +13,18 @@ class Order(Base):
     destination = Column(String, index=True)
     status = Column(String, default="pending")
     fleet_id = Column(Integer, ForeignKey("fleets.id"))
+    quantity = Column(Integer, nullable=False, default=1, server_default="1")
+    reserved = Column(Integer, nullable=False, default=0, server_default="0")  # Units of stock held, see inventory.py
 
     product = relationship("Product", back_populates="orders")
     fleet = relationship("Fleet", back_populates="orders")
 
+    __table_args__ = (
+        # Covers both dispatch planner reads: per-fleet open load
+        # (status, fleet_id) and pending orders by destination
+        Index("ix_orders_status_fleet_id_destination", "status", "fleet_id", "destination"),
+    )
+
 
 class Product(Base):
     __tablename__ = "products"
@@ -33,8 +41,8 @@ class Fleet(Base):
     name = Column(String, index=True)
     driver_id = Column(Integer, ForeignKey("drivers.id"))
     status = Column(String, index=True)
-    vehicle_type = Column(String, index=True)
-    last_maintenance = Column(String, index=True)
+    vehicle_type = Column(String)
+    last_maintenance = Column(String)
 
     driver = relationship("Driver", back_populates="fleets")
     orders = relationship("Order", back_populates="fleet")
@@ -54,8 +62,11 @@ class Report(Base):
     id = Column(Integer, primary_key=True, index=True)
     month = Column(String, index=True, nullable=False)  # e.g. "June 2025"
     title = Column(String, nullable=False)  # Short summary/title
-    file_url = Column(String, nullable=False)  # Path or URL to file
+    file_url = Column(String, nullable=False)  # Path or URL to file, "" until generated
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    status = Column(String, nullable=False, default="done", server_default="done")  # queued, done or failed
+    format = Column(String)  # "csv" or "pdf" for generated reports
+    error = Column(String)  # Why generation failed
 
 
 class Route(Base):
@@ -78,6 +89,29 @@ class Shipment(Base):
     )  # e.g. "pending", "shipped", "delivered", "delayed"
     revenue = Column(Float, default=0.0)
     shipped_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     route = relationship("Route", back_populates="shipments")
+
+    __table_args__ = (
+        Index("ix_shipments_status_shipped_at", "status", "shipped_at"),
+        Index("ix_shipments_route_id_shipped_at", "route_id", "shipped_at"),
+    )
+
+
+class ShipmentDailyRollup(Base):
+    __tablename__ = "shipment_daily_rollups"
+    day = Column(String, primary_key=True)  # "YYYY-MM-DD" of shipped_at, "" if unshipped
+    route_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)  # lower-cased Shipment.status
+    shipments = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class ShipmentMonthlyRollup(Base):
+    __tablename__ = "shipment_monthly_rollups"
+    month = Column(String, primary_key=True)  # "YYYY-MM" of shipped_at, "" if unshipped
+    route_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)  # lower-cased Shipment.status
+    shipments = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,132 @@
+"""
+Group commit for single-order webhook calls.
+
+With ORDER_INGEST=group, ``/api/orders/webhook/`` no longer writes the
+order itself. It puts the validated order on an in-process queue and waits.
+A writer thread takes orders off the queue until it has ORDER_BATCH_SIZE of
+them or ORDER_FLUSH_MS have passed since the first one, then reserves their
+stock and inserts them in one transaction through
+``ingest.reserve_and_insert``. Only after that transaction has committed is
+each caller handed its new id (or its OutOfStock or UnknownProduct), so a
+response is never sent for an order that could still be lost.
+
+The writer keeps its own connection with ``synchronous=FULL``: every group
+commit is fsynced, and that one fsync is shared by the whole batch, where
+per-request commits each pay their own.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.orm import Session
+
+from database import SQLITE_PRAGMAS, engine
+import ingest
+
+ORDER_INGEST = os.getenv("ORDER_INGEST", "direct")
+ORDER_BATCH_SIZE = int(os.getenv("ORDER_BATCH_SIZE", "500"))
+ORDER_FLUSH_MS = float(os.getenv("ORDER_FLUSH_MS", "2"))
+
+_STOP = object()
+
+
+class OrderQueue:
+    def __init__(self, batch_size: int = ORDER_BATCH_SIZE, flush_ms: float = ORDER_FLUSH_MS):
+        self.batch_size = min(batch_size, ingest.CHUNK_SIZE)
+        self.flush_seconds = flush_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.orders = 0
+
+    def submit(self, order) -> Future:
+        """Queues a validated OrderCreate; the future resolves to the created order's fields."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="order-queue", daemon=True)
+                self._thread.start()
+            self._queue.put((order, future))
+        return future
+
+    def stop(self):
+        """Writes whatever is queued, then stops the writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        thread.join()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "orders": self.orders,
+            "mean_batch": self.orders / self.batches if self.batches else 0.0,
+        }
+
+    def _run(self):
+        connection = engine.connect()
+        if engine.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous=FULL")
+        try:
+            while True:
+                batch, stop = self._collect()
+                if batch:
+                    self._flush(connection, batch)
+                if stop:
+                    return
+        finally:
+            if engine.dialect.name == "sqlite":
+                # Back to the engine's setting (or SQLite's default) before
+                # the pool hands the connection out again
+                connection.exec_driver_sql(f"PRAGMA synchronous={SQLITE_PRAGMAS.get('synchronous', 'FULL')}")
+            connection.close()
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _flush(self, connection, batch):
+        # Callers that went away before the write started are left out
+        batch = [(order, future) for order, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        rows = [(i, {**order.dict(), "status": "pending"}) for i, (order, _) in enumerate(batch)]
+        db = Session(bind=connection)
+        try:
+            ids, rejected = ingest.reserve_and_insert(db, rows)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            db.close()
+        self.batches += 1
+        self.orders += len(ids)
+        rejected = dict(rejected)
+        ids = iter(ids)
+        for i, (order, future) in enumerate(batch):
+            if i in rejected:
+                future.set_exception(rejected[i])
+            else:
+                values = rows[i][1]
+                future.set_result({**values, "id": next(ids), "fleet_id": None, "reserved": values["quantity"]})
+
+
+order_queue = OrderQueue()
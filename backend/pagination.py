@@ -0,0 +1,86 @@
+"""
+Keyset pagination shared by the list endpoints.
+
+A page is requested either the old way with ``skip``/``limit`` or with an
+opaque ``cursor`` taken from the previous page's ``X-Next-Cursor`` response
+header. With a cursor the query seeks straight to the next key instead of
+walking and discarding ``skip`` rows. The header is omitted on the last page.
+"""
+import base64
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy.sql import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _seek(query, column, cursor: str | None, skip: int):
+    query = query.order_by(column)
+    if cursor is not None:
+        last = decode_cursor(cursor)
+        if not isinstance(last, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(column > last)
+    elif skip:
+        query = query.offset(skip)
+    return query
+
+
+def _page(rows, response: Response, limit: int, key):
+    # One extra row was fetched to learn whether another page exists
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if rows:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
+
+
+def paginate(
+    query: Query,
+    column,
+    response: Response,
+    cursor: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    key=lambda row: row.id,
+):
+    """
+    Returns one page of ``query`` ordered by the unique integer ``column``.
+
+    ``key`` extracts the column value from a result row, for queries that
+    select tuples rather than a single entity.
+    """
+    rows = _seek(query, column, cursor, skip).limit(limit + 1).all()
+    return _page(rows, response, limit, key)
+
+
+async def paginate_async(
+    db: AsyncSession,
+    stmt: Select,
+    column,
+    response: Response,
+    cursor: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+    key=lambda row: row.id,
+):
+    """``paginate`` for a ``select()`` run on an AsyncSession."""
+    result = await db.execute(_seek(stmt, column, cursor, skip).limit(limit + 1))
+    rows = result.scalars().all() if len(stmt.column_descriptions) == 1 else result.all()
+    return _page(rows, response, limit, key)
@@ -0,0 +1,287 @@
+"""
+Background generation of monthly report files.
+
+``create_report`` without a ``file_url`` stores the report as "queued" and
+hands it to ``submit``. A worker in a process pool (REPORT_WORKERS
+processes, so building a report never holds the GIL the API threads need)
+reads the month's totals and per-route summary from the monthly rollups and
+the current fleet usage, and writes a CSV or PDF into REPORTS_DIR. When the
+job finishes the report row gets its ``file_url`` and status "done", or
+status "failed" and the error.
+
+File names carry a hash of their content, so the files are served with
+immutable caching (see files.py). Reports still queued when the server
+stopped are queued again on startup.
+
+    python reports.py 2025-06 --format pdf    # build one by hand
+"""
+import argparse
+import csv
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import case, distinct, func, select
+
+from database import ReadSessionLocal, SessionLocal
+from models import Fleet, Order, Report, Route, ShipmentMonthlyRollup
+
+REPORTS_DIR = os.path.abspath(os.getenv("REPORTS_DIR", "reports"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+FORMATS = {"csv": "text/csv", "pdf": "application/pdf"}
+QUEUED, DONE, FAILED = "queued", "done", "failed"
+
+# Orders a fleet is currently carrying (as in dispatch.OPEN_STATUSES)
+OPEN_STATUSES = ("assigned", "shipped")
+
+PDF_LINES_PER_PAGE = 64
+
+_FILE_NAME = re.compile(r"^report-\d+-\d{4}-\d{2}-[0-9a-f]{16}\.(csv|pdf)$")
+
+logger = logging.getLogger("logistics.reports")
+
+
+class ReportError(ValueError):
+    pass
+
+
+def parse_month(month: str) -> str:
+    """Normalises "June 2025", "Jun 2025" or "2025-06" to "2025-06"."""
+    for fmt in ("%B %Y", "%b %Y", "%Y-%m"):
+        try:
+            return datetime.strptime(month.strip(), fmt).strftime("%Y-%m")
+        except ValueError:
+            continue
+    raise ReportError(f"Unrecognised month {month!r}; expected e.g. 'June 2025' or '2025-06'")
+
+
+def file_path(name: str):
+    """The path of a generated report file, or None for names we never produce."""
+    if not _FILE_NAME.match(name):
+        return None
+    path = os.path.join(REPORTS_DIR, name)
+    return path if os.path.exists(path) else None
+
+
+def file_url(name: str) -> str:
+    return f"/api/reports/files/{name}"
+
+
+# Building (runs in the worker processes)
+
+
+def collect(month: str):
+    """The figures for ``month`` ("YYYY-MM") as (title, header, rows) sections."""
+    rollup = ShipmentMonthlyRollup
+    db = ReadSessionLocal()
+    try:
+        routes = db.execute(
+            select(
+                Route.name,
+                func.sum(rollup.shipments),
+                func.sum(case((rollup.status == "delivered", rollup.shipments), else_=0)),
+                func.sum(case((rollup.status == "delayed", rollup.shipments), else_=0)),
+                func.sum(rollup.revenue),
+            )
+            .join(Route, Route.id == rollup.route_id)
+            .where(rollup.month == month)
+            .group_by(Route.id)
+            .order_by(func.sum(rollup.revenue).desc())
+        ).all()
+        fleets = db.execute(
+            select(
+                Fleet.vehicle_type,
+                func.count(distinct(Fleet.id)),
+                func.count(distinct(case((Fleet.status == "active", Fleet.id)))),
+                func.count(Order.id),
+            )
+            .outerjoin(Order, (Order.fleet_id == Fleet.id) & Order.status.in_(OPEN_STATUSES))
+            .group_by(Fleet.vehicle_type)
+            .order_by(Fleet.vehicle_type)
+        ).all()
+    finally:
+        db.close()
+
+    shipments = sum(r[1] for r in routes)
+    delivered = sum(r[2] for r in routes)
+    delayed = sum(r[3] for r in routes)
+    revenue = sum(r[4] for r in routes)
+    on_time = f"{delivered / (delivered + delayed):.1%}" if delivered + delayed else "-"
+    return [
+        (
+            f"Summary {month}",
+            ("metric", "value"),
+            [
+                ("revenue", f"{revenue:.2f}"),
+                ("shipments", shipments),
+                ("deliveries", delivered),
+                ("delayed", delayed),
+                ("on-time rate", on_time),
+            ],
+        ),
+        (
+            "Routes",
+            ("route", "shipments", "delivered", "delayed", "revenue"),
+            [(name, n, d, late, f"{rev:.2f}") for name, n, d, late, rev in routes],
+        ),
+        (
+            # Orders carry no dates, so fleet usage is as of generation time
+            "Fleet usage",
+            ("vehicle type", "fleets", "active", "open orders"),
+            [(vehicle_type or "-", n, active, orders) for vehicle_type, n, active, orders in fleets],
+        ),
+    ]
+
+
+def render_csv(sections) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, (title, header, rows) in enumerate(sections):
+        if i:
+            writer.writerow([])
+        writer.writerow([title])
+        writer.writerow(header)
+        writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _pdf_text(value) -> str:
+    text = str(value).replace("→", "->").encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(sections) -> bytes:
+    """A plain text PDF (Courier, so the columns line up); no PDF library needed."""
+    lines = []
+    for title, header, rows in sections:
+        table = [tuple(str(v) for v in header)] + [tuple(str(v) for v in row) for row in rows]
+        widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+        lines += [title, ""]
+        for row in table:
+            lines.append("  ".join(v.ljust(w) if i == 0 else v.rjust(w) for i, (v, w) in enumerate(zip(row, widths))))
+        lines.append("")
+    pages = [lines[i : i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>"]
+    kids = []
+    for page in pages:
+        text = " ".join(f"({_pdf_text(line)}) Tj T*" for line in page)
+        stream = f"BT /F1 9 Tf 11 TL 36 806 Td {text} ET".encode("latin-1")
+        kids.append(f"{len(objects) + 1} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {len(objects) + 2} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build(report_id: int, month: str, fmt: str) -> str:
+    """Writes the report file and returns its name."""
+    sections = collect(month)
+    content = render_pdf(sections) if fmt == "pdf" else render_csv(sections)
+    name = f"report-{report_id}-{month}-{hashlib.sha256(content).hexdigest()[:16]}.{fmt}"
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    tmp = os.path.join(REPORTS_DIR, f".{name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, os.path.join(REPORTS_DIR, name))
+    return name
+
+
+# Scheduling (runs in the API process)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking would copy the parent's threads and open
+            # SQLite connections into the worker
+            _executor = ProcessPoolExecutor(REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _finish(report_id: int, future):
+    if future.cancelled():
+        # Shutting down: stays queued and is resumed on the next start
+        return
+    try:
+        name, error = future.result(), None
+    except Exception as e:  # the job failed, or its worker died
+        name, error = None, f"{type(e).__name__}: {e}"
+        logger.error("Report %s failed", report_id, exc_info=e)
+    db = SessionLocal()
+    try:
+        report = db.get(Report, report_id)
+        if report is None:
+            # Deleted while it was being built
+            if name:
+                remove_file(file_url(name))
+            return
+        if name:
+            report.file_url, report.status, report.error = file_url(name), DONE, None
+        else:
+            report.status, report.error = FAILED, error
+        db.commit()
+    finally:
+        db.close()
+
+
+def submit(report_id: int, month: str, fmt: str):
+    future = _pool().submit(build, report_id, parse_month(month), fmt)
+    future.add_done_callback(lambda f: _finish(report_id, f))
+    return future
+
+
+def resume(db):
+    """Queues again the reports left queued by a previous run."""
+    queued = db.query(Report.id, Report.month, Report.format).filter(Report.status == QUEUED).all()
+    for report_id, month, fmt in queued:
+        submit(report_id, month, fmt or "csv")
+    return len(queued)
+
+
+def remove_file(url: str):
+    name = url.rsplit("/", 1)[-1] if url else ""
+    path = file_path(name)
+    if path:
+        os.remove(path)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a monthly report file.")
+    parser.add_argument("month", help="e.g. 'June 2025' or 2025-06")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    args = parser.parse_args()
+    print(os.path.join(REPORTS_DIR, build(0, parse_month(args.month), args.format)))
@@ -0,0 +1,196 @@
+"""
+Precomputed shipment totals for the dashboard.
+
+Every Shipment contributes to one row in ``shipment_daily_rollups`` and one
+row in ``shipment_monthly_rollups``, keyed by the shipped_at bucket, route
+and lower-cased status. The rows are kept current by mapper events that run
+inside the flush that writes the shipment, so they commit (or roll back)
+together with it.
+
+Writes that bypass the ORM (core bulk inserts, raw SQL) do not fire the
+events; run ``python rollups.py`` afterwards to rebuild from scratch.
+"""
+import argparse
+from datetime import date
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from cache import response_cache
+from database import SessionLocal, engine
+from models import Base, Route, Shipment, ShipmentDailyRollup, ShipmentMonthlyRollup
+
+# Columns whose changes move a shipment between rollup buckets
+TRACKED = ("shipped_at", "route_id", "status", "revenue")
+
+
+def _key(shipped_at, route_id, status):
+    day = shipped_at.strftime("%Y-%m-%d") if shipped_at else ""
+    return day, route_id, (status or "").lower()
+
+
+def _apply(connection, key, shipments: int, revenue: float):
+    day, route_id, status = key
+    for table, bucket_col, bucket in (
+        (ShipmentDailyRollup.__table__, "day", day),
+        (ShipmentMonthlyRollup.__table__, "month", day[:7]),
+    ):
+        stmt = insert(table).values(
+            {bucket_col: bucket, "route_id": route_id, "status": status, "shipments": shipments, "revenue": revenue}
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[bucket_col, "route_id", "status"],
+            set_={
+                "shipments": table.c.shipments + shipments,
+                "revenue": table.c.revenue + revenue,
+            },
+        )
+        connection.execute(stmt)
+
+
+def _old_value(target, attr):
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+@event.listens_for(Shipment, "after_insert")
+def _on_insert(mapper, connection, target):
+    key = _key(target.shipped_at, target.route_id, target.status)
+    _apply(connection, key, 1, target.revenue or 0.0)
+
+
+@event.listens_for(Shipment, "after_update")
+def _on_update(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[attr].history.has_changes() for attr in TRACKED):
+        return
+    old = {attr: _old_value(target, attr) for attr in TRACKED}
+    _apply(connection, _key(old["shipped_at"], old["route_id"], old["status"]), -1, -(old["revenue"] or 0.0))
+    _apply(connection, _key(target.shipped_at, target.route_id, target.status), 1, target.revenue or 0.0)
+
+
+@event.listens_for(Shipment, "after_delete")
+def _on_delete(mapper, connection, target):
+    old = {attr: _old_value(target, attr) for attr in TRACKED}
+    _apply(connection, _key(old["shipped_at"], old["route_id"], old["status"]), -1, -(old["revenue"] or 0.0))
+
+
+# Load the previous value on assignment so after_update can always see it,
+# even when the attribute was expired by an earlier commit.
+for _attr in TRACKED:
+    event.listen(getattr(Shipment, _attr), "set", lambda *args: None, active_history=True)
+
+
+def rebuild(db: Session):
+    """Recompute both rollup tables from ``shipments`` in one transaction."""
+    daily, monthly = ShipmentDailyRollup.__table__, ShipmentMonthlyRollup.__table__
+    day = func.coalesce(func.strftime("%Y-%m-%d", Shipment.shipped_at), "")
+    status = func.lower(Shipment.status)
+    db.execute(delete(daily))
+    db.execute(
+        daily.insert().from_select(
+            ["day", "route_id", "status", "shipments", "revenue"],
+            select(
+                day,
+                Shipment.route_id,
+                status,
+                func.count(Shipment.id),
+                func.coalesce(func.sum(Shipment.revenue), 0.0),
+            ).group_by(day, Shipment.route_id, status),
+        )
+    )
+    # Months are summed from the days, not from another scan of shipments
+    month = func.substr(daily.c.day, 1, 7)
+    db.execute(delete(monthly))
+    db.execute(
+        monthly.insert().from_select(
+            ["month", "route_id", "status", "shipments", "revenue"],
+            select(
+                month,
+                daily.c.route_id,
+                daily.c.status,
+                func.sum(daily.c.shipments),
+                func.sum(daily.c.revenue),
+            ).group_by(month, daily.c.route_id, daily.c.status),
+        )
+    )
+    db.commit()
+    response_cache.invalidate(Shipment.__tablename__)
+
+
+def ensure_built(db: Session):
+    """Backfill the rollups once for databases created before they existed."""
+    has_rollups = db.query(ShipmentMonthlyRollup.month).first() is not None
+    if not has_rollups and db.query(Shipment.id).first() is not None:
+        rebuild(db)
+
+
+def totals(db: Session):
+    """Returns (shipments, delivered, pending, delayed, revenue) over all time."""
+    m = ShipmentMonthlyRollup
+    rows = db.query(m.status, func.sum(m.shipments), func.sum(m.revenue)).group_by(m.status).all()
+    by_status = {status: count or 0 for status, count, _ in rows}
+    return (
+        sum(by_status.values()),
+        by_status.get("delivered", 0),
+        by_status.get("pending", 0),
+        by_status.get("delayed", 0),
+        # Float even with no rows, as the pydantic path would render it
+        sum((revenue or 0.0 for _, _, revenue in rows), 0.0),
+    )
+
+
+def monthly_counts(db: Session, months: list[str]):
+    """Maps each "YYYY-MM" in ``months`` to its shipment count."""
+    m = ShipmentMonthlyRollup
+    rows = (
+        db.query(m.month, func.sum(m.shipments))
+        .filter(m.month.in_(months))
+        .group_by(m.month)
+        .all()
+    )
+    return dict(rows)
+
+
+def top_routes(db: Session, limit: int, since: date = None, until: date = None, status: str = None):
+    """
+    Ranks routes by shipment count.
+
+    ``since``/``until`` bound the shipped_at day (both inclusive) and are
+    answered from the daily rollup; without them the monthly rollup is used.
+    """
+    windowed = since is not None or until is not None
+    m = ShipmentDailyRollup if windowed else ShipmentMonthlyRollup
+    count = func.sum(m.shipments)
+    q = db.query(Route.name, count).select_from(m).outerjoin(Route, m.route_id == Route.id)
+    if windowed:
+        q = q.filter(m.day != "")
+    if since is not None:
+        q = q.filter(m.day >= since.isoformat())
+    if until is not None:
+        q = q.filter(m.day <= until.isoformat())
+    if status:
+        q = q.filter(m.status == status.lower())
+    rows = (
+        q.group_by(m.route_id)
+        .having(count > 0)
+        .order_by(count.desc(), Route.name)
+        .limit(limit)
+        .all()
+    )
+    return [{"route": name or "Unknown", "count": c} for name, c in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the shipment rollup tables.")
+    parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        rebuild(db)
+    finally:
+        db.close()
+    print("Rebuilt shipment rollups")
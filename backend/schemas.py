@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 
 class ProductBase(BaseModel):
@@ -24,21 +24,61 @@ class OrderBase(BaseModel):
     customer_name: str
     destination: str
     product_id: int
+    quantity: int = 1
 
 
 class OrderCreate(OrderBase):
-    pass
+    quantity: int = Field(1, ge=1)
 
 
 class OrderModel(OrderBase):
     id: int
     status: str
     fleet_id: int | None
+    reserved: int
 
     class Config:
         orm_mode = True
 
 
+class BulkOrderError(BaseModel):
+    index: int
+    errors: list[dict]
+
+
+class BulkOrderResponse(BaseModel):
+    ids: list[int]
+    errors: list[BulkOrderError]
+
+
+class FleetAssignment(BaseModel):
+    order_id: int
+    fleet_id: int
+
+
+class StatusUpdate(BaseModel):
+    order_id: int
+    status: str
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+    missing: list[int]
+
+
+class DispatchFleetLoad(BaseModel):
+    fleet_id: int
+    orders: int
+    remaining_capacity: int
+
+
+class DispatchResponse(BaseModel):
+    assigned: int
+    unassigned: int
+    committed: bool
+    fleets: list[DispatchFleetLoad]
+
+
 class DriverBase(BaseModel):
     name: str
 
@@ -68,7 +108,8 @@ class FleetCreate(FleetBase):
 
 class FleetModel(FleetBase):
     id: int
-    driver_name: str
+    driver_id: Optional[int]
+    driver_name: Optional[str]
 
     class Config:
         orm_mode = True
@@ -81,12 +122,17 @@ class ReportBase(BaseModel):
 
 
 class ReportCreate(ReportBase):
-    pass
+    # Without a file_url the report file is generated in the background
+    file_url: Optional[str] = None
+    format: Literal["csv", "pdf"] = "csv"
 
 
 class ReportModel(ReportBase):
     id: int
     created_at: datetime
+    status: str
+    format: Optional[str]
+    error: Optional[str]
 
     class Config:
         orm_mode = True
@@ -122,6 +168,15 @@ class ShipmentModel(ShipmentBase):
         orm_mode = True
 
 
+class TrackingLookup(BaseModel):
+    tracking_ids: list[str] = Field(..., min_items=1, max_items=1000)
+
+
+class TrackingLookupResponse(BaseModel):
+    shipments: list[ShipmentModel]
+    missing: list[str]
+
+
 class DashboardKPIs(BaseModel):
     totalOrders: int
     deliveries: int
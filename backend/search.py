@@ -0,0 +1,153 @@
+"""
+Full-text search over orders and shipments, backed by SQLite FTS5.
+
+``orders_fts`` indexes order_name, customer_name and destination;
+``shipments_fts`` indexes tracking_id and customer_name. Both are external
+content tables (they store only the index, the rows stay in the base
+tables), kept in sync by triggers, so every write path (ORM, Core bulk
+inserts, raw SQL) updates them in the same transaction.
+
+Queries match every word by prefix ("gra mil" finds "Grace Miller") and are
+ranked by bm25. Ranking is limited to the RANK_WINDOW newest matches: a
+common prefix like "lag" matches a quarter of all orders, and scoring every
+one of them costs hundreds of milliseconds; the window keeps every query in
+the tens of milliseconds. Pages past the window go on through the older
+matches newest first, unranked, by a keyset on the id, so every match can
+still be reached.
+"""
+import re
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.engine import Connection
+
+# table -> indexed columns
+INDEXED = {
+    "orders": ("order_name", "customer_name", "destination"),
+    "shipments": ("tracking_id", "customer_name"),
+}
+
+# Longest query accepted, in words
+MAX_TERMS = 8
+
+# Newest matches that get ranked; later pages follow the rest by id
+RANK_WINDOW = 5000
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchError(ValueError):
+    pass
+
+
+def fts_table(name: str):
+    """The FTS table for base table ``name``, for use in queries."""
+    return table(f"{name}_fts", column("rowid"), column("rank"))
+
+
+def _triggers(name: str, columns):
+    fts = f"{name}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return {
+        f"{fts}_ai": f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {name} BEGIN {insert} END",
+        f"{fts}_ad": f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {name} BEGIN {delete} END",
+        # Only the indexed columns: status and fleet updates skip the index
+        f"{fts}_au": f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {name} BEGIN {delete} {insert} END",
+    }
+
+
+def ensure_index(conn: Connection):
+    """
+    Creates any missing FTS table or trigger and fills it from its base
+    table. Returns the names of the FTS tables (re)built.
+    """
+    if conn.dialect.name != "sqlite":
+        return []
+    existing = {
+        name
+        for (name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+    }
+    built = []
+    for name, columns in INDEXED.items():
+        if name not in existing:
+            continue
+        fts = f"{name}_fts"
+        triggers = _triggers(name, columns)
+        if fts in existing and existing.issuperset(triggers):
+            continue
+        # Triggers vanish with a dropped base table; the index is stale then
+        for trigger in triggers:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+        conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(columns)}, "
+            f"content='{name}', content_rowid='id', "
+            # Prefix indexes make 2- and 3-character prefixes a lookup
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        for ddl in triggers.values():
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        built.append(fts)
+    return built
+
+
+def match_query(q: str) -> str:
+    """Turns free text into an FTS5 query: every word, as a prefix."""
+    terms = _WORD.findall(q or "")
+    if not terms:
+        raise SearchError("Search query must contain at least one letter or digit")
+    if len(terms) > MAX_TERMS:
+        raise SearchError(f"Search query is limited to {MAX_TERMS} words")
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _matches(model, q: str):
+    fts = fts_table(model.__tablename__)
+    match = text(f"{model.__tablename__}_fts MATCH :match").bindparams(match=match_query(q))
+    return fts, select(fts.c.rowid).where(match)
+
+
+def search(query, model, q: str, skip: int, limit: int, before: int = None):
+    """
+    Filters and orders ``query`` (over ``model``'s table) by relevance to
+    ``q``. Returns (rows, next) where ``next`` is the next page's position:
+    an offset into the ranked window, {"before": id} once past it, or None
+    on the last page. ``before`` continues from such a position.
+    """
+    fts, matches = _matches(model, q)
+    if before is not None:
+        candidates = (
+            matches.where(fts.c.rowid < before).order_by(fts.c.rowid.desc()).limit(limit + 1).subquery()
+        )
+        rows = query.join(candidates, candidates.c.rowid == model.id).order_by(model.id.desc()).all()
+        if len(rows) > limit:
+            return rows[:limit], {"before": rows[limit - 1].id}
+        return rows, None
+
+    # FTS5 walks matches in rowid order cheaply and computes rank lazily, so
+    # only the candidates inside the window are scored
+    candidates = (
+        matches.add_columns(fts.c.rank).order_by(fts.c.rowid.desc()).limit(RANK_WINDOW).subquery()
+    )
+    rows = (
+        query.join(candidates, candidates.c.rowid == model.id)
+        .order_by(candidates.c.rank, model.id.desc())
+        .offset(skip)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return rows[:limit], skip + limit
+    # The window is used up; older matches, if any, come next
+    edge = (
+        query.session.execute(matches.order_by(fts.c.rowid.desc()).offset(RANK_WINDOW - 1).limit(2))
+        .scalars()
+        .all()
+    )
+    return rows, {"before": edge[0]} if len(edge) == 2 else None
@@ -1,177 +1,262 @@
 # seed_data.py
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+"""
+Deterministic data generator for local development and benchmarks.
+
+    python seeder.py                          # the small demo dataset
+    python seeder.py --scale 1e6 --seed 7     # a million shipments
+
+``--scale`` is the number of shipments; drivers, fleets, products, orders,
+routes, customers and reports are sized from it. The same ``--scale``,
+``--seed`` and ``--as-of`` always produce the same rows. Existing data is
+dropped first.
+
+A million shipments take about 45 s: about a third generating the rows, the
+rest building the indexes, the search index and the rollups once the rows are in.
+"""
+import argparse
+import math
+import random
+import time
+from bisect import bisect
+from datetime import date, datetime, time as dtime, timedelta
+from itertools import accumulate
+
 from database import SessionLocal, engine, Base
 from models import Product, Order, Fleet, Driver, Report, Route, Shipment
-from datetime import datetime, timedelta
-import random
+import rollups
+import search
 
-# Create all tables if they don't exist yet
-Base.metadata.create_all(bind=engine)
+CITIES = [
+    "Lagos", "Abuja", "Port Harcourt", "Kano", "Ibadan", "Onitsha", "Enugu",
+    "Benin City", "Kaduna", "Owerri", "Uyo", "Ilorin", "Jos", "Calabar",
+    "Abeokuta", "Warri", "Maiduguri", "Akure", "Sokoto", "Asaba",
+]
+FIRST_NAMES = [
+    "Oluchi", "Tunde", "Grace", "Killerman", "Joseph", "Amina", "Samuel",
+    "Chidi", "Fatima", "Emeka", "Ngozi", "Bola", "Ibrahim", "Kemi", "Musa",
+    "Ada", "Segun", "Zainab", "Femi", "Halima",
+]
+LAST_NAMES = [
+    "Nwankwo", "Benedicta", "Miller", "Sage", "Edem", "Bello", "Nwachukwu",
+    "Okafor", "Adeyemi", "Musa", "Eze", "Ogunleye", "Abubakar", "Okoro",
+    "Balogun", "Danjuma", "Obi", "Lawal", "Ibe", "Yusuf",
+]
+PRODUCTS = ["Laptop", "Phone", "Tablet", "Headphones", "Monitor", "Printer", "Router", "Camera"]
+VEHICLE_TYPES = ["Truck", "Motorcycle", "Car", "Airplane"]
+STATUSES = ["pending", "shipped", "delivered", "delayed"]
 
+# Status mix by how long ago the shipment entered the system
+STATUS_WEIGHTS_BY_AGE = [
+    (3, [0.50, 0.40, 0.05, 0.05]),
+    (14, [0.10, 0.35, 0.45, 0.10]),
+    (None, [0.00, 0.02, 0.88, 0.10]),
+]
 
-def seed_data():
-    db: Session = SessionLocal()
+# Multiplier coprime with 10**10: i -> i * M mod 10**10 is a bijection, so
+# tracking ids look random but never collide below ten billion shipments
+_TRACKING_MULTIPLIER = 7_919_000_003
+_TRACKING_SPACE = 10**10
 
-    try:
-        # Clear existing data (optional)
-        db.query(Order).delete()
-        db.query(Fleet).delete()
-        db.query(Product).delete()
-        db.query(Driver).delete()
-        db.commit()
-
-        # Seed Drivers
-        driver_names = ["John Doe", "Jane Smith", "Michael Johnson", "Alice Brown"]
-        drivers = [Driver(name=name) for name in driver_names]
-        db.add_all(drivers)
-        db.commit()
-
-        # Seed Fleets
-        fleets = [
-            Fleet(
-                name=f"Fleet {i+1}",
-                driver_id=random.choice(drivers).id,
-                status=random.choice(["active", "maintenance", "inactive"]),
-                last_maintenance="2025-08-01",
-                vehicle_type=random.choice(["Truck", "Motorcycle", "Car", "Airplane"])
-            )
-            for i in range(4)
-        ]
-        db.add_all(fleets)
-        db.commit()
-
-        # Seed Products
-        product_names = ["Laptop", "Phone", "Tablet", "Headphones"]
-        products = [
-            Product(name=name, quantity=random.randint(5, 20)) for name in product_names
-        ]
-        db.add_all(products)
-        db.commit()
-
-        # Seed Orders
-        destinations = ["New York", "Los Angeles", "Chicago", "Houston"]
-        customer_name = ["Killerman Sage", "Oluchi Nwankwo", "Tunde Benedicta", "Grace Miller"]
-        orders = [
-            Order(
-                order_name=f"Order {i+1}",
-                product_id=random.choice(products).id,
-                destination=random.choice(destinations),
-                customer_name=random.choice(customer_name),
-                status=random.choice(["pending", "shipped", "delivered"]),
-                fleet_id=random.choice(fleets).id,
-            )
-            for i in range(5)
-        ]
-        db.add_all(orders)
-        db.commit()
-        
-        months = ["June 2025", "May 2025", "April 2025", "March 2025"]
-        titles = [
-            "Revenue, Deliveries, Fleet usage",
-            "Delivery insights, Operational cost",
-            "Performance metrics, Routes summary",
-            "Customer satisfaction, Fuel efficiency"
-        ]
-        file_urls = [
-            "/reports/june2025.pdf",
-            "/reports/may2025.pdf",
-            "/reports/april2025.pdf",
-            "/reports/march2025.pdf"
-        ]
-
-        reports = [
-            Report(
-                month=random.choice(months),
-                title=random.choice(titles),
-                file_url=random.choice(file_urls),
-                created_at=datetime.utcnow()
-            )
-            for _ in range(6)
-        ]
-
-        db.add_all(reports)
-        db.commit()
-
-        print("✅ Database seeded successfully!")
-    
-        ROUTES = [
-            "Lagos → Abuja",
-            "Lagos → Port Harcourt",
-            "Abuja → Kano",
-            "Onitsha → Enugu",
-            "Ibadan → Ilorin",
-            "Owerri → Uyo",
-        ]
-
-        CUSTOMERS = [
-            "Oluchi Nwankwo", "Tunde Benedicta", "Grace Miller",
-            "Killerman Sage", "Joseph Edem", "Amina Bello", "Samuel Nwachukwu"
-        ]
-
-        STATUSES = ["pending", "shipped", "delivered", "delayed"]
-
-        def random_date_within_last_months(months_back=6):
-            # pick random day in last `months_back` months
-            now = datetime.utcnow()
-            days_back = random.randint(0, months_back * 30)
-            return now - timedelta(days=days_back)
-        
-        try:
-            routes = [
-                Route(name=name)
-                for name in ROUTES
-            ]
-
-            db.add_all(routes)
-            db.commit()
-            
-            route_objs = []
-            for r in ROUTES:
-                obj = db.query(Route).filter(Route.name == r).first()
-                if not obj:
-                    obj = Route(name=r)
-                    db.add(obj)
-                    try:
-                        db.commit()
-                    except IntegrityError:
-                        db.rollback()
-                        obj = db.query(Route).filter(Route.name == r).first()
-                route_objs.append(obj)
-
-            # create shipments
-            shipments = []
-            for i in range(60):  # create 60 sample shipments
-                route = random.choice(route_objs)
-                status = random.choices(STATUSES, weights=[0.25, 0.25, 0.4, 0.1])[0]
-                shipped_at = random_date_within_last_months(6) if status != "pending" else None
-                tracking_id = f"TRK{random.randint(1000,9999)}"
-                s = Shipment(
-                    tracking_id=tracking_id,
-                    customer_name=random.choice(CUSTOMERS),
-                    route_id=route.id,
-                    status=status,
-                    revenue=round(random.uniform(50, 500), 2),
-                    shipped_at=shipped_at
+BATCH_SIZE = 100_000
+
+
+def tracking_id(i: int) -> str:
+    return f"TRK{(i * _TRACKING_MULTIPLIER) % _TRACKING_SPACE:010d}"
+
+
+def _ts(value: datetime) -> str:
+    # The storage format SQLAlchemy's SQLite DateTime type reads and writes
+    return value.isoformat(" ", "microseconds")
+
+
+def zipf_weights(n: int, s: float = 1.0):
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+def _insert(conn, table, columns, rows):
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.exec_driver_sql(sql, batch)
+            batch = []
+    if batch:
+        conn.exec_driver_sql(sql, batch)
+
+
+def _sizes(scale: int):
+    return {
+        "shipments": scale,
+        "orders": max(5, scale // 2),
+        "drivers": max(4, scale // 500),
+        "fleets": max(4, scale // 500),
+        "products": max(4, scale // 2000),
+        "customers": max(7, scale // 20),
+        "routes": max(6, min(len(CITIES) * (len(CITIES) - 1), int(math.sqrt(scale) / 2))),
+        "reports": 6,
+    }
+
+
+def generate(scale: int = 60, seed: int = 42, as_of: date = None, verbose: bool = True):
+    rng = random.Random(seed)
+    as_of = datetime.combine(as_of or date.today(), dtime.min)
+    sizes = _sizes(scale)
+    started = time.perf_counter()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    customers = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(sizes["customers"])
+    ]
+    customer_weights = list(accumulate(zipf_weights(len(customers), 0.8)))
+
+    # Routes between distinct cities, busiest corridors first
+    pairs = [(a, b) for a in CITIES for b in CITIES if a != b]
+    rng.shuffle(pairs)
+    route_names = [f"{a} → {b}" for a, b in pairs[: sizes["routes"]]]
+    route_weights = list(accumulate(zipf_weights(len(route_names))))
+    route_price = [round(rng.uniform(60, 400), 2) for _ in route_names]
+
+    with engine.begin() as conn:
+        # Building each index once after the load beats updating it per row
+        indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+        for index in indexes:
+            index.drop(conn)
+
+        _insert(conn, Driver.__table__, ["name"], ((rng.choice(customers),) for _ in range(sizes["drivers"])))
+        _insert(
+            conn,
+            Fleet.__table__,
+            ["name", "driver_id", "status", "vehicle_type", "last_maintenance"],
+            (
+                (
+                    f"Fleet {i}",
+                    i if i <= sizes["drivers"] else rng.randint(1, sizes["drivers"]),
+                    rng.choices(["active", "maintenance", "inactive"], [0.8, 0.12, 0.08])[0],
+                    rng.choices(VEHICLE_TYPES, [0.45, 0.25, 0.25, 0.05])[0],
+                    (as_of - timedelta(days=rng.randint(0, 180))).date().isoformat(),
+                )
+                for i in range(1, sizes["fleets"] + 1)
+            ),
+        )
+        _insert(
+            conn,
+            Product.__table__,
+            ["name", "quantity"],
+            (
+                (f"{PRODUCTS[i % len(PRODUCTS)]} {i // len(PRODUCTS) + 1}", rng.randint(5, 500))
+                for i in range(sizes["products"])
+            ),
+        )
+
+        city_weights = zipf_weights(len(CITIES), 0.9)
+        product_weights = list(accumulate(zipf_weights(sizes["products"], 1.1)))
+        n = sizes["orders"]
+        _insert(
+            conn,
+            Order.__table__,
+            ["order_name", "product_id", "customer_name", "destination", "status", "fleet_id"],
+            (
+                (f"ORD-{i:08d}", product_id, customer, destination, status, None if status == "pending" else fleet_id)
+                for i, product_id, customer, destination, status, fleet_id in zip(
+                    range(1, n + 1),
+                    rng.choices(range(1, sizes["products"] + 1), cum_weights=product_weights, k=n),
+                    rng.choices(customers, cum_weights=customer_weights, k=n),
+                    rng.choices(CITIES, city_weights, k=n),
+                    rng.choices(["pending", "assigned", "shipped", "delivered"], [0.2, 0.15, 0.2, 0.45], k=n),
+                    rng.choices(range(1, sizes["fleets"] + 1), k=n),
                 )
-                shipments.append(s)
+            ),
+        )
 
-            db.add_all(shipments)
-            db.commit()
-            print("Seeded routes & shipments")
-        except Exception as e:
-            db.rollback()
-            print("Seeding failed:", e)
-        finally:
-            db.close()
+        months = [(as_of.replace(day=1) - timedelta(days=31 * i)).strftime("%B %Y") for i in range(sizes["reports"])]
+        _insert(
+            conn,
+            Report.__table__,
+            ["month", "title", "file_url", "created_at"],
+            (
+                (
+                    month,
+                    "Revenue, Deliveries, Fleet usage",
+                    f"/reports/{month.replace(' ', '').lower()}.pdf",
+                    _ts(datetime.strptime(month, "%B %Y").replace(day=28) + timedelta(days=4)),
+                )
+                for month in months
+            ),
+        )
+
+        _insert(
+            conn,
+            Route.__table__,
+            ["name", "created_at"],
+            ((name, _ts(as_of - timedelta(days=730))) for name in route_names),
+        )
+
+        def shipments():
+            # Drawn a batch at a time: one choices(k=...) call per column is far
+            # cheaper than a call per row
+            route_ids = range(1, len(route_names) + 1)
+            status_cum = [(limit, list(accumulate(weights))) for limit, weights in STATUS_WEIGHTS_BY_AGE]
+            for start in range(1, scale + 1, BATCH_SIZE):
+                n = min(BATCH_SIZE, scale + 1 - start)
+                routes = rng.choices(route_ids, cum_weights=route_weights, k=n)
+                names = rng.choices(customers, cum_weights=customer_weights, k=n)
+                for i, route_id, customer in zip(range(start, start + n), routes, names):
+                    # Volume grows towards the present and dips at weekends
+                    age = min(730.0, rng.expovariate(1 / 120))
+                    created_at = as_of - timedelta(days=age)
+                    if created_at.weekday() >= 5 and rng.random() < 0.5:
+                        age = min(730.0, rng.expovariate(1 / 120))
+                        created_at = as_of - timedelta(days=age)
+                    for limit, cum in status_cum:
+                        if limit is None or age < limit:
+                            status = STATUSES[bisect(cum, rng.random() * cum[-1])]
+                            break
+                    shipped_at = None
+                    if status != "pending":
+                        shipped_at = _ts(created_at + timedelta(hours=rng.uniform(2, 48)))
+                    yield (
+                        tracking_id(i),
+                        customer,
+                        route_id,
+                        status,
+                        round(route_price[route_id - 1] * rng.lognormvariate(0, 0.35), 2),
+                        shipped_at,
+                        _ts(created_at),
+                    )
 
-    except Exception as e:
-        db.rollback()
-        print(f"❌ Error seeding database: {e}")
+        _insert(
+            conn,
+            Shipment.__table__,
+            ["tracking_id", "customer_name", "route_id", "status", "revenue", "shipped_at", "created_at"],
+            shipments(),
+        )
 
+        for index in indexes:
+            index.create(conn)
+        search.ensure_index(conn)
+
+    db = SessionLocal()
+    try:
+        rollups.rebuild(db)
     finally:
         db.close()
 
+    if verbose:
+        counts = ", ".join(f"{n} {name}" for name, n in sizes.items())
+        print(f"✅ Database seeded in {time.perf_counter() - started:.1f}s: {counts}")
+
+
+def seed_data():
+    generate()
+
 
 if __name__ == "__main__":
-    seed_data()
+    parser = argparse.ArgumentParser(description="Generate a deterministic logistics dataset.")
+    parser.add_argument("--scale", type=float, default=60, help="number of shipments, e.g. 1e6")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="YYYY-MM-DD, default today")
+    args = parser.parse_args()
+    generate(int(args.scale), args.seed, args.as_of)
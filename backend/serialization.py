@@ -0,0 +1,75 @@
+"""
+Fast serialization for read endpoints.
+
+With SERIALIZATION=fast (the default) list and dashboard endpoints select
+only the columns their response model declares, as plain row tuples, and
+encode them straight to JSON with orjson. That skips building ORM instances
+and FastAPI's per-row re-validation through the ``orm_mode`` models, which
+for DB output we already trust. The JSON is identical: same keys, same
+order, same datetime format. SERIALIZATION=pydantic restores the old path.
+"""
+import json
+import os
+from datetime import date, datetime
+
+from fastapi import Response
+
+from pagination import NEXT_CURSOR_HEADER
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+SERIALIZATION = os.getenv("SERIALIZATION", "fast")
+FAST = SERIALIZATION == "fast"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def columns(item_model, entity, **extra):
+    """
+    The columns for ``item_model``'s fields, in field order, each labelled
+    with its field name. ``extra`` maps fields that are not attributes of
+    ``entity`` (joined values) to their column expression.
+    """
+    return [
+        (extra[name] if name in extra else getattr(entity, name)).label(name)
+        for name in item_model.__fields__
+    ]
+
+
+def as_dicts(rows):
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(content, response: Response = None) -> FastJSONResponse:
+    """
+    Wraps ``content`` in a FastJSONResponse. Returning a Response bypasses
+    FastAPI's handling of the injected ``response``, so its cursor header is
+    carried over here.
+    """
+    headers = {}
+    if response is not None and NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+    return FastJSONResponse(content, headers=headers)
@@ -0,0 +1,296 @@
+"""
+Shipment lookup by tracking id, the endpoint customers hit most.
+
+Found shipments are kept, already serialized, in a bounded LRU. A Bloom
+filter over every tracking id answers "unknown" for mistyped ids without a
+query, and the few unknown ids that slip through it (false positives) are
+remembered in a negative LRU, so a repeated miss never reaches the database
+either.
+
+ORM writes keep all three current: once a session commits, the shipments it
+inserted, updated or deleted are dropped from both LRUs and new tracking ids
+are added to the filter. Rows written outside the ORM reach the filter on
+its next refresh (at most every TRACKING_REFRESH_SECONDS, reading only ids
+above the high-water mark), and cached shipments expire after
+TRACKING_CACHE_TTL.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+import serialization
+from database import in_chunks, read_engine
+from models import Shipment
+from schemas import ShipmentModel
+
+CACHE_SIZE = int(os.getenv("TRACKING_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("TRACKING_CACHE_TTL", "60"))
+NEGATIVE_CACHE_SIZE = int(os.getenv("TRACKING_NEGATIVE_CACHE_SIZE", "10000"))
+REFRESH_SECONDS = float(os.getenv("TRACKING_REFRESH_SECONDS", "5"))
+
+BLOOM_ERROR_RATE = 0.001
+# The filter is sized for twice the current ids and rebuilt when full
+BLOOM_HEADROOM = 2
+BLOOM_MIN_CAPACITY = 65_536
+
+LOAD_BATCH = 100_000
+
+_MASK64 = (1 << 64) - 1
+_LOAD_SQL = "SELECT id, tracking_id FROM shipments WHERE id > ? ORDER BY id LIMIT ?"
+
+
+def _mix(h):
+    # splitmix64 finalizer; works on ints and on uint64 arrays alike
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB & _MASK64
+    return h ^ (h >> 31)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    # The filter lives in one process, so the built-in (per-process seeded)
+    # str hash serves as h1; the second hash is derived from it by mixing
+    def _positions(self, key: str):
+        h1 = hash(key) & _MASK64
+        h2 = _mix(h1) | 1
+        return [((h1 + i * h2) & _MASK64) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str):
+        for p in self._positions(key):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def add_many(self, keys):
+        """``add`` for a large batch, with the bit positions computed in NumPy."""
+        if not keys:
+            return
+        h1 = np.fromiter(map(hash, keys), np.int64, len(keys)).view(np.uint64)
+        with np.errstate(over="ignore"):
+            h2 = _mix(h1) | np.uint64(1)
+            steps = np.arange(self.hash_count, dtype=np.uint64)
+            # uint64 arithmetic wraps like the & _MASK64 in _positions
+            positions = (h1[:, None] + steps * h2[:, None]) % np.uint64(self.size)
+        bits = np.zeros(len(self._bits) * 8, bool)
+        bits[positions.ravel()] = True
+        packed = np.packbits(bits, bitorder="little")
+        self._bits = bytearray(np.bitwise_or(np.frombuffer(self._bits, np.uint8), packed).tobytes())
+        self.count += len(keys)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] >> (p & 7) & 1 for p in self._positions(key))
+
+
+class TrackingCache:
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float = CACHE_TTL, negative_size: int = NEGATIVE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_size = negative_size
+        self._found = OrderedDict()
+        self._missing = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # Bumped by every invalidation; a lookup only caches what it read if
+        # nothing was invalidated while it ran
+        self._generation = 0
+        self.bloom = None
+        self.high_water_id = 0
+        self.refreshed_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.bloom_rejections = 0
+        self.evictions = 0
+
+    def reload(self):
+        with self._refresh_lock:
+            self.bloom = None
+            self.high_water_id = 0
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        with self._refresh_lock:
+            if not force and self.bloom is not None and time.monotonic() - self.refreshed_at < REFRESH_SECONDS:
+                return
+            with read_engine.connect() as conn:
+                cursor = conn.connection.cursor()
+                try:
+                    self._load(cursor)
+                finally:
+                    cursor.close()
+            self.refreshed_at = time.monotonic()
+
+    def _load(self, cursor):
+        bloom, high_water_id = self.bloom, self.high_water_id
+        if bloom is None:
+            (count,) = cursor.execute("SELECT count(*) FROM shipments").fetchone()
+            bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, count * BLOOM_HEADROOM))
+            high_water_id = 0
+        added = False
+        while True:
+            rows = cursor.execute(_LOAD_SQL, (high_water_id, LOAD_BATCH)).fetchall()
+            if not rows:
+                break
+            if bloom.count + len(rows) > bloom.capacity:
+                # Full: rebuild at twice the size from scratch
+                bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, (bloom.count + len(rows)) * BLOOM_HEADROOM))
+                high_water_id = 0
+                continue
+            bloom.add_many([tracking_id for _, tracking_id in rows])
+            high_water_id = rows[-1][0]
+            added = True
+        self.bloom, self.high_water_id = bloom, high_water_id
+        if added:
+            # Some of the remembered misses may exist now
+            with self._lock:
+                self._generation += 1
+                self._missing.clear()
+
+    def lookup(self, db: Session, tracking_ids):
+        """
+        Returns (found, missing): ``found`` maps each known tracking id to its
+        shipment as a ShipmentModel dict, ``missing`` lists the unknown ones.
+        """
+        self.refresh()
+        found = {}
+        to_query = []
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            for tracking_id in tracking_ids:
+                entry = self._found.get(tracking_id)
+                if entry is not None and entry[1] > now:
+                    self._found.move_to_end(tracking_id)
+                    found[tracking_id] = entry[0]
+                    self.hits += 1
+                elif tracking_id in self._missing:
+                    self._missing.move_to_end(tracking_id)
+                    self.negative_hits += 1
+                elif tracking_id not in self.bloom:
+                    self.bloom_rejections += 1
+                else:
+                    to_query.append(tracking_id)
+                    self.misses += 1
+        if to_query:
+            loaded = self._query(db, to_query)
+            found.update(loaded)
+            self._store(loaded, [t for t in to_query if t not in loaded], generation, now + self.ttl)
+        return found, [t for t in tracking_ids if t not in found]
+
+    def _query(self, db: Session, tracking_ids):
+        columns = serialization.columns(ShipmentModel, Shipment)
+        loaded = {}
+        for chunk in in_chunks(tracking_ids):
+            rows = db.query(*columns).filter(Shipment.tracking_id.in_(chunk)).all()
+            for row in serialization.as_dicts(rows):
+                loaded[row["tracking_id"]] = row
+        return loaded
+
+    def _store(self, loaded, missing, generation: int, expires: float):
+        with self._lock:
+            if generation != self._generation:
+                return
+            for tracking_id, row in loaded.items():
+                self._found[tracking_id] = (row, expires)
+                self._found.move_to_end(tracking_id)
+            for tracking_id in missing:
+                self._missing[tracking_id] = True
+                self._missing.move_to_end(tracking_id)
+            while len(self._found) > self.maxsize:
+                self._found.popitem(last=False)
+                self.evictions += 1
+            while len(self._missing) > self.negative_size:
+                self._missing.popitem(last=False)
+
+    def invalidate(self, tracking_ids, inserted=()):
+        with self._lock:
+            self._generation += 1
+            for tracking_id in tracking_ids:
+                self._found.pop(tracking_id, None)
+                self._missing.pop(tracking_id, None)
+        if self.bloom is not None:
+            with self._refresh_lock:
+                for tracking_id in inserted:
+                    self.bloom.add(tracking_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._found.clear()
+            self._missing.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negativeHits": self.negative_hits,
+                "bloomRejections": self.bloom_rejections,
+                "evictions": self.evictions,
+                "entries": len(self._found),
+                "negativeEntries": len(self._missing),
+                "maxsize": self.maxsize,
+                "bloomIds": self.bloom.count if self.bloom is not None else 0,
+                "bloomBytes": len(self.bloom._bits) if self.bloom is not None else 0,
+                "highWaterId": self.high_water_id,
+            }
+
+
+tracker = TrackingCache()
+
+
+def _changes(target):
+    session = object_session(target)
+    return session.info.setdefault("tracking_changes", (set(), set())) if session is not None else None
+
+
+@event.listens_for(Shipment, "after_insert")
+def _on_insert(mapper, connection, target):
+    changes = _changes(target)
+    if changes is not None:
+        changes[0].add(target.tracking_id)
+        changes[1].add(target.tracking_id)
+
+
+@event.listens_for(Shipment, "after_update")
+@event.listens_for(Shipment, "after_delete")
+def _on_change(mapper, connection, target):
+    changes = _changes(target)
+    if changes is None:
+        return
+    history = inspect(target).attrs.tracking_id.history
+    changes[0].update(history.deleted)
+    changes[0].add(target.tracking_id)
+    if history.deleted:
+        # Renamed: the new id is new to the filter
+        changes[1].add(target.tracking_id)
+
+
+# Load the previous tracking id on assignment so a rename drops the old entry
+event.listen(Shipment.tracking_id, "set", lambda *args: None, active_history=True)
+
+
+# Invalidate only once the change is visible to other connections, so a
+# concurrent lookup cannot re-cache the old row
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session):
+    changes = session.info.pop("tracking_changes", None)
+    if changes:
+        tracker.invalidate(*changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed(session):
+    session.info.pop("tracking_changes", None)